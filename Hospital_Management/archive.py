@@ -0,0 +1,91 @@
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, literal, select
+from models import db, Appointment, Treatment, ArchivedAppointment, ArchivedTreatment
+from versions import bump_versions, doctor_scope
+from app import create_app
+
+ARCHIVE_STATUSES = ('Completed', 'Cancelled')
+
+appointments = Appointment.__table__
+treatments = Treatment.__table__
+archived_appointments = ArchivedAppointment.__table__
+archived_treatments = ArchivedTreatment.__table__
+
+
+# Moves one batch in its own short transaction and returns how many
+# appointments it moved. The live row with the highest id is never moved:
+# SQLite hands out max(id) + 1 for new rows, so keeping it stops a new
+# appointment from reusing an archived id.
+def archive_batch(connection, cutoff, batch_size):
+    highest_id = select(func.max(appointments.c.id)).scalar_subquery()
+    rows = connection.execute(
+        select(appointments.c.id, appointments.c.doctor_id).where(
+            appointments.c.status.in_(ARCHIVE_STATUSES),
+            appointments.c.appointment_date < cutoff,
+            appointments.c.id < highest_id
+        ).order_by(appointments.c.id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    ids = [row.id for row in rows]
+    now = datetime.utcnow()
+    connection.execute(archived_appointments.insert().from_select(
+        ['id', 'patient_id', 'doctor_id', 'appointment_date', 'appointment_time', 'status', 'created_at',
+         'archived_at'],
+        select(appointments.c.id, appointments.c.patient_id, appointments.c.doctor_id,
+               appointments.c.appointment_date, appointments.c.appointment_time, appointments.c.status,
+               appointments.c.created_at, literal(now, ArchivedAppointment.archived_at.type))
+        .where(appointments.c.id.in_(ids))
+    ))
+    connection.execute(archived_treatments.insert().from_select(
+        ['appointment_id', 'diagnosis', 'prescription', 'notes', 'created_at'],
+        select(treatments.c.appointment_id, treatments.c.diagnosis, treatments.c.prescription,
+               treatments.c.notes, treatments.c.created_at)
+        .where(treatments.c.appointment_id.in_(ids)).order_by(treatments.c.id)
+    ))
+    connection.execute(treatments.delete().where(treatments.c.appointment_id.in_(ids)))
+    connection.execute(appointments.delete().where(appointments.c.id.in_(ids)))
+    # Counters are unchanged: they count archived appointments too.
+    bump_versions(connection, 'appointments', *{doctor_scope(row.doctor_id) for row in rows})
+    return len(ids)
+
+
+# Archives completed and cancelled appointments dated before `cutoff`, a
+# batch at a time. Each batch holds the write lock only for its own few
+# statements, and `pause` seconds between batches let bookings through.
+def archive_appointments(cutoff, batch_size=500, pause=0.05, limit=None):
+    if cutoff > date.today():
+        raise ValueError('The archive cutoff cannot be in the future')
+    moved = 0
+    started = time.perf_counter()
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        with db.engine.begin() as connection:
+            count = archive_batch(connection, cutoff, size)
+        if not count:
+            break
+        moved += count
+        print(f"  {moved} appointments archived ({moved / (time.perf_counter() - started):.0f} rows/sec)")
+        time.sleep(pause)
+    return moved
+
+
+if __name__ == '__main__':
+    app = create_app()
+    parser = argparse.ArgumentParser(description='Move old completed and cancelled appointments, with their '
+                                                 'treatments, to the archive tables')
+    parser.add_argument('--days', type=int, default=app.config['ARCHIVE_AFTER_DAYS'],
+                        help='archive appointments older than this many days (default: ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.05, help='seconds to wait between batches')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many appointments')
+    args = parser.parse_args()
+
+    cutoff = date.today() - timedelta(days=args.days)
+    with app.app_context():
+        db.create_all()
+        moved = archive_appointments(cutoff, args.batch_size, args.pause, args.limit)
+    print(f"Archived {moved} appointments dated before {cutoff.isoformat()}")
@@ -0,0 +1 @@
+# Benchmarks and stress scripts, run with python -m bench.<name>
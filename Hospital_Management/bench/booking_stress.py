@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+# Point the app at a throwaway database before it is imported.
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'booking_stress.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app
+from models import db, User, Doctor, Patient, Department, Appointment, DoctorAvailability, ScheduleRule
+from routes.booking import book_slot, BOOKED, NOT_AVAILABLE, OUTSIDE_HOURS, SLOT_TAKEN
+from routes.slots import SEARCH_WINDOW_DAYS
+
+app = create_app()
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+
+def seed():
+    with app.app_context():
+        db.create_all()
+        department = Department(name='Cardiology')
+        db.session.add(department)
+        user = User(email='doctor@stress.test', role='doctor', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        doctor = Doctor(user_id=user.id, name='Dr Stress', department_id=department.id)
+        db.session.add(doctor)
+        db.session.flush()
+
+        slot_date = date.today() + timedelta(days=1)
+        db.session.add(DoctorAvailability(doctor_id=doctor.id, date=slot_date,
+                                          start_time=time(9), end_time=time(17)))
+        # Round-the-clock weekly hours, so only the date checks can refuse
+        # the bookings in check_booking_dates.
+        for weekday in range(7):
+            db.session.add(ScheduleRule(doctor_id=doctor.id, weekday=weekday,
+                                        start_time=time(0), end_time=time(23, 59)))
+        patient_ids = []
+        for i in range(THREADS):
+            user = User(email=f'patient{i}@stress.test', role='patient', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            patient = Patient(user_id=user.id, name=f'Patient {i}')
+            db.session.add(patient)
+            db.session.flush()
+            patient_ids.append(patient.id)
+        db.session.commit()
+        return doctor.id, slot_date, patient_ids
+
+
+def main():
+    doctor_id, slot_date, patient_ids = seed()
+    barrier = threading.Barrier(len(patient_ids))
+    results = Counter()
+    lock = threading.Lock()
+
+    def worker(patient_id):
+        with app.app_context():
+            barrier.wait()
+            try:
+                result, _ = book_slot(patient_id, doctor_id, slot_date, time(10))
+            except Exception as error:
+                result = type(error).__name__
+            with lock:
+                results[result] += 1
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in patient_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        stored = Appointment.query.filter_by(doctor_id=doctor_id, appointment_date=slot_date,
+                                             appointment_time=time(10)).count()
+
+    print(f"{len(patient_ids)} concurrent bookings: {dict(results)}")
+    print(f"Appointments stored for the slot: {stored}")
+    if results[BOOKED] != 1 or stored != 1:
+        print("FAILED: the slot was not booked exactly once")
+        sys.exit(1)
+    print("OK: exactly one booking won, every other request got a clean result")
+
+    check_booking_dates(doctor_id, patient_ids[-1])
+    check_slot_grid(doctor_id, slot_date, patient_ids[-2])
+
+
+# Weekly rules give windows on every date, so book_slot itself has to refuse
+# past slots and dates beyond the slot search window.
+def check_booking_dates(doctor_id, patient_id):
+    today = date.today()
+    last_day = today + timedelta(days=SEARCH_WINDOW_DAYS - 1)
+    cases = [
+        ('yesterday', today - timedelta(days=1), time(9, 30), NOT_AVAILABLE),
+        ('years ago', date(2020, 1, 6), time(9, 30), NOT_AVAILABLE),
+        ('after the search window', last_day + timedelta(days=1), time(9, 30), NOT_AVAILABLE),
+        ('years ahead', today + timedelta(days=5 * 365), time(9, 30), NOT_AVAILABLE),
+        ('last day of the search window', last_day, time(9, 30), BOOKED),
+    ]
+    passed = (datetime.now() - timedelta(minutes=1)).replace(second=0, microsecond=0)
+    if passed.date() == today:
+        cases.append(('earlier today', today, passed.time(), NOT_AVAILABLE))
+
+    failures = []
+    with app.app_context():
+        for name, day, slot_time, expected in cases:
+            result, _ = book_slot(patient_id, doctor_id, day, slot_time)
+            if result != expected:
+                failures.append(f"{name} ({day} {slot_time:%H:%M}): {result}, expected {expected}")
+    if failures:
+        print("FAILED: " + '; '.join(failures))
+        sys.exit(1)
+    print(f"OK: bookings before now or after {last_day} were refused")
+
+
+# The unique index only sees equal start times, so book_slot has to refuse
+# times off the slot grid, slots running past the window (09:00-17:00 on
+# slot_date) and slots overlapping an older off-grid appointment.
+def check_slot_grid(doctor_id, slot_date, patient_id):
+    with app.app_context():
+        db.session.add(Appointment(patient_id=patient_id, doctor_id=doctor_id,
+                                   appointment_date=slot_date, appointment_time=time(12, 5)))
+        db.session.commit()
+    cases = [
+        ('five minutes after a booking', time(10, 5), OUTSIDE_HOURS),
+        ('end of the window', time(17), OUTSIDE_HOURS),
+        ('before an off-grid appointment', time(12), SLOT_TAKEN),
+        ('after an off-grid appointment', time(12, 15), SLOT_TAKEN),
+        ('last slot of the window', time(16, 45), BOOKED),
+    ]
+
+    failures = []
+    with app.app_context():
+        for name, slot_time, expected in cases:
+            result, _ = book_slot(patient_id, doctor_id, slot_date, slot_time)
+            if result != expected:
+                failures.append(f"{name} ({slot_time:%H:%M}): {result}, expected {expected}")
+    if failures:
+        print("FAILED: " + '; '.join(failures))
+        sys.exit(1)
+    print("OK: only free slots on the grid inside the window were booked")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bulk_bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app
+from models import db, Appointment, Patient, User
+from counters import rebuild_counters
+from routes.bulk import cancel_booked_appointments, deactivate_patients
+from bench.seed import add_volume_arguments, seed_database, volumes
+
+app = create_app({'TESTING': True})
+
+appointments = Appointment.__table__
+users = User.__table__
+
+
+# The per-row loops do what the single-row views did for each click: load
+# the row, change it through the ORM and commit.
+def cancel_loop(appointment_ids):
+    for appointment_id in appointment_ids:
+        appointment = db.session.get(Appointment, appointment_id)
+        appointment.status = 'Cancelled'
+        db.session.commit()
+    return len(appointment_ids)
+
+
+def deactivate_loop(patient_ids):
+    for patient_id in patient_ids:
+        patient = db.session.get(Patient, patient_id)
+        user = db.session.get(User, patient.user_id)
+        user.is_active = False
+        db.session.commit()
+    return len(patient_ids)
+
+
+def _timed(run, *args):
+    db.session.expire_all()
+    started = time.perf_counter()
+    count = run(*args)
+    return count, (time.perf_counter() - started) * 1000
+
+
+# Puts the rows back between the two runs.
+def _restore(appointment_ids=(), user_ids=()):
+    with db.engine.begin() as connection:
+        if appointment_ids:
+            connection.execute(appointments.update().where(appointments.c.id.in_(appointment_ids))
+                               .values(status='Booked'))
+        if user_ids:
+            connection.execute(users.update().where(users.c.id.in_(user_ids)).values(is_active=True))
+        rebuild_counters(connection)
+
+
+def _report(name, size, loop, bulk):
+    (loop_count, loop_ms), (bulk_count, bulk_ms) = loop, bulk
+    if loop_count != bulk_count:
+        raise SystemExit(f'{name}: the loop changed {loop_count} rows, the bulk UPDATE {bulk_count}')
+    print(f"{name:<28}{size:>8}{loop_ms:>14.1f}{bulk_ms:>14.1f}{loop_ms / bulk_ms:>10.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk cancel and deactivate: per-row ORM loop vs one UPDATE')
+    add_volume_arguments(parser)
+    parser.set_defaults(doctors=10, appointments=100000)
+    parser.add_argument('--users', type=int, nargs='+', default=[10, 100, 1000],
+                        help='how many patients to deactivate')
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed_database(**volumes(args))
+        print(f"{'operation':<28}{'rows':>8}{'loop ms':>14}{'bulk ms':>14}{'speedup':>11}")
+
+        doctor_id = db.session.query(Appointment.doctor_id).filter_by(status='Booked').group_by(
+            Appointment.doctor_id).order_by(db.func.count().desc()).limit(1).scalar()
+        booked = db.session.query(Appointment.id, Appointment.appointment_date).filter_by(
+            doctor_id=doctor_id, status='Booked').order_by(Appointment.appointment_date).all()
+        first_day, last_day = booked[0].appointment_date, booked[-1].appointment_date
+        ids = [row.id for row in booked]
+        loop = _timed(cancel_loop, ids)
+        _restore(appointment_ids=ids)
+        bulk = _timed(cancel_booked_appointments, doctor_id, first_day, last_day)
+        _report('cancel booked (one doctor)', len(ids), loop, bulk)
+
+        for size in args.users:
+            rows = db.session.query(Patient.id, Patient.user_id).join(User, User.id == Patient.user_id).filter(
+                User.is_active == True).order_by(Patient.id).limit(size).all()
+            patient_ids = [row.id for row in rows]
+            loop = _timed(deactivate_loop, patient_ids)
+            _restore(user_ids=[row.user_id for row in rows])
+            bulk = _timed(deactivate_patients, patient_ids)
+            _restore(user_ids=[row.user_id for row in rows])
+            _report('deactivate patients', len(patient_ids), loop, bulk)
+
+
+if __name__ == '__main__':
+    main()
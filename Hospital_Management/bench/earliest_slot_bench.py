@@ -0,0 +1,100 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'earliest_slot_bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app
+from models import db, Patient
+from routes.booking import book_slot, BOOKED
+from routes.reference import get_active_doctors
+from routes.slots import SEARCH_WINDOW_DAYS, bookable_days, earliest_slots, slot_cache, slot_index
+from bench.seed import add_volume_arguments, seed_database, volumes
+
+app = create_app({'TESTING': True})
+
+
+def _median_ms(run, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _once_ms(run):
+    started = time.perf_counter()
+    run()
+    return (time.perf_counter() - started) * 1000
+
+
+# What a patient has to do without the search: open every doctor's booking
+# page and compare the first free slot of each.
+def per_doctor_scan(department_id):
+    firsts = []
+    for doctor in get_active_doctors(department_id):
+        days = bookable_days(doctor.id)
+        if days:
+            firsts.append((days[0][0], days[0][1][0], doctor.id))
+    return sorted(firsts)[:1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Earliest free slot across a department: indexed search vs '
+                                                 'checking doctor by doctor')
+    add_volume_arguments(parser)
+    parser.set_defaults(departments=2, doctors=600, patients=5000, appointments=60000, history_days=30)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed_database(**volumes(args))
+        today = date.today()
+        week = today + timedelta(days=6)
+        window = today + timedelta(days=SEARCH_WINDOW_DAYS - 1)
+        department_id = max((len(get_active_doctors(department.id)), department.id)
+                            for department in [*{doctor.department for doctor in get_active_doctors()}])[1]
+        doctors = len(get_active_doctors(department_id))
+
+        results = []
+        slot_index.clear()
+        results.append(('search, cold index (7 days)',
+                        _once_ms(lambda: earliest_slots(department_id, today, week, args.limit))))
+        results.append(('search, warm index',
+                        _median_ms(lambda: earliest_slots(department_id, today, week, args.limit), args.iterations)))
+
+        # Booking the first slot marks one doctor stale for one day; the
+        # next search reloads only that doctor.
+        first = earliest_slots(department_id, today + timedelta(days=1), week, 1)[0]
+        patient_id = db.session.query(Patient.id).limit(1).scalar()
+        if book_slot(patient_id, first.doctor.id, first.date, first.time)[0] != BOOKED:
+            raise SystemExit('could not book the earliest slot')
+        results.append(('search after a booking',
+                        _once_ms(lambda: earliest_slots(department_id, today + timedelta(days=1), week, args.limit))))
+
+        # Nothing is scheduled after the seeded week, so these searches read
+        # every remaining day of the window and find nothing.
+        empty = (department_id, today + timedelta(days=7), window, args.limit)
+        results.append((f'empty days 8-{SEARCH_WINDOW_DAYS}, cold', _once_ms(lambda: earliest_slots(*empty))))
+        results.append((f'empty days 8-{SEARCH_WINDOW_DAYS}, warm',
+                        _median_ms(lambda: earliest_slots(*empty), args.iterations)))
+
+        slot_cache.clear()
+        results.append(('doctor by doctor, cold cache', _once_ms(lambda: per_doctor_scan(department_id))))
+        results.append(('doctor by doctor, warm cache',
+                        _median_ms(lambda: per_doctor_scan(department_id), max(args.iterations // 10, 3))))
+
+    print(f"{doctors} active doctors in department {department_id}, limit {args.limit}")
+    for name, ms in results:
+        print(f"{name:<36}{ms:>10.2f} ms")
+    print(slot_index.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Streams the admin appointment export at growing table sizes and reports
+# the peak Python memory of each download. The table is grown in place by
+# copying the seeded appointments (and their treatments) further into the
+# past, which keeps one slot per doctor and patient and is much faster than
+# seeding a million rows from Python. Exits non-zero if the peak at the
+# largest size is more than --tolerance times the peak at the smallest.
+
+
+def _grow(db, base_rows, target_rows):
+    from sqlalchemy import text
+    with db.engine.begin() as connection:
+        current = connection.execute(text('SELECT COUNT(*) FROM appointments')).scalar()
+        while current < target_rows:
+            copies = current // base_rows
+            count = min(base_rows, target_rows - current)
+            # Seeded ids are 1..base_rows, so copy k of appointment i gets
+            # id i + k * base_rows.
+            connection.execute(text(
+                'INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, status, '
+                'created_at) SELECT patient_id, doctor_id, date(appointment_date, :shift), appointment_time, '
+                'status, created_at FROM appointments WHERE id <= :count ORDER BY id'
+            ), {'shift': f'-{400 * copies} days', 'count': count})
+            connection.execute(text(
+                'INSERT INTO treatments (appointment_id, diagnosis, prescription, notes, created_at) '
+                'SELECT appointment_id + :offset, diagnosis, prescription, notes, created_at FROM treatments '
+                'WHERE appointment_id <= :count ORDER BY appointment_id'
+            ), {'offset': copies * base_rows, 'count': count})
+            current += count
+
+
+def _download(client, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def run(args):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'export_memory.db')
+
+    from app import create_app
+    from models import db, User
+    from bench.seed import seed_database
+    app = create_app({'TESTING': True})
+
+    sizes = sorted(args.sizes)
+    with app.app_context():
+        seed_database(doctors=50, patients=2000, appointments=sizes[0], history_days=365)
+        admin = User.query.filter_by(role='admin').first()
+        admin_session = {'user_id': admin.id, 'role': 'admin', 'name': 'Bench Admin', 'email': admin.email}
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(admin_session)
+
+    print(f"{'rows':>10}  {'export':<24}{'MB sent':>10}{'seconds':>10}{'peak KB':>10}")
+    peaks = {}
+    for rows in sizes:
+        with app.app_context():
+            _grow(db, sizes[0], rows)
+        for query in args.formats:
+            size, elapsed, peak = _download(client, f'/admin/appointments/export?{query}')
+            peaks.setdefault(query, []).append(peak)
+            print(f"{rows:>10}  {query:<24}{size / 1e6:>10.1f}{elapsed:>10.1f}{peak / 1024:>10.0f}")
+
+    growth = max(values[-1] / values[0] for values in peaks.values())
+    print(f"Largest peak growth from {sizes[0]} to {sizes[-1]} rows: {growth:.2f}x")
+    return growth <= args.tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of the streaming appointment export')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--formats', nargs='+', default=['format=csv', 'format=ndjson&gzip=1'])
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    sys.exit(0 if run(parser.parse_args()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Renders admin/appointments.html over one large page of appointments three
+# ways: with the fragment cache off, on a cold cache and on a warm one, and
+# then after editing a few rows (only those rows re-render). The rows are
+# loaded by one query before each timed case, so the timings are template
+# work only.
+
+
+def _render(app, page, rounds):
+    from flask import render_template
+    timings = []
+    with app.test_request_context('/admin/appointments'):
+        for _ in range(rounds):
+            started = time.perf_counter()
+            html = render_template('admin/appointments.html', appointments=page.items, page=page)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings, len(html)
+
+
+def run(args):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fragment_bench.db')
+
+    from app import create_app
+    from models import db, Appointment
+    from fragments import fragment_cache
+    from routes.pagination import KeysetPage
+    from routes.queries import admin_appointment_query
+    from bench.seed import seed_database
+    app = create_app({'TESTING': True})
+
+    with app.app_context():
+        seed_database(doctors=50, patients=2000, appointments=args.rows)
+        rows = admin_appointment_query().order_by(Appointment.created_at.desc()).limit(args.rows).all()
+        page = KeysetPage(rows, len(rows))
+        print(f"Rendering {len(rows)} appointment rows, {args.rounds} rounds each")
+        print(f"{'case':<20}{'mean ms':>10}{'min ms':>10}{'KB':>9}")
+
+        def report(name, timings, size):
+            print(f"{name:<20}{statistics.fmean(timings):>10.1f}{min(timings):>10.1f}{size / 1024:>9.0f}")
+
+        app.jinja_env.fragment_cache_enabled = False
+        report('uncached', *_render(app, page, args.rounds))
+
+        app.jinja_env.fragment_cache_enabled = True
+        fragment_cache.clear()
+        report('cold cache', *_render(app, page, 1))
+        report('warm cache', *_render(app, page, args.rounds))
+
+        for appointment in rows[:args.edits]:
+            appointment.status = 'Cancelled' if appointment.status != 'Cancelled' else 'Booked'
+        db.session.commit()
+        rows = admin_appointment_query().order_by(Appointment.created_at.desc()).limit(args.rows).all()
+        page = KeysetPage(rows, len(rows))
+        report(f'{args.edits} rows edited', *_render(app, page, 1))
+        print(fragment_cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Admin appointments table render time with and without '
+                                                 'the fragment cache')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--edits', type=int, default=10)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'login_bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app
+from models import db, User, Patient
+from passwords import hash_password
+
+app = create_app()
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:100000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+]
+
+
+def seed(methods):
+    with app.app_context():
+        db.create_all()
+        for i, method in enumerate(methods):
+            user = User(email=f'user{i}@bench.test', role='patient',
+                        password_hash=hash_password('secret', method))
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Patient(user_id=user.id, name=f'Bench {i}'))
+        db.session.commit()
+
+
+def run(email, threads, duration):
+    stop_at = time.perf_counter() + duration
+    counts = [0] * threads
+
+    def worker(index):
+        client = app.test_client()
+        while time.perf_counter() < stop_at:
+            response = client.post('/login', data={'email': email, 'password': 'secret'})
+            assert response.status_code == 302 and '/login' not in response.location
+            counts[index] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput per password hashing cost')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 4])
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    seed(args.methods)
+    print(f"{'method':<24}{'hash workers':>14}{'logins/sec':>14}")
+    for i, method in enumerate(args.methods):
+        # Match the policy to the stored hash so logins do not trigger a rehash.
+        app.config['PASSWORD_HASH_METHOD'] = method
+        for workers in args.workers:
+            app.config['PASSWORD_HASH_WORKERS'] = workers
+            rate = run(f'user{i}@bench.test', args.threads, args.duration)
+            print(f"{method:<24}{workers:>14}{rate:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
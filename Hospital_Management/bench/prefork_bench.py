@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup time and per-worker memory of a pre-forking server, simulated with
+# os.fork. `preload` builds the app once in the master and forks the workers
+# from it (gunicorn --preload); `per-worker` forks first and has every worker
+# build its own app. Each worker logs in as the admin and serves a few pages,
+# then reports its RSS and PSS while all workers are still alive, so pages
+# shared with the master are split between the processes that map them.
+MODES = ['preload', 'per-worker']
+PAGES = ['/admin/dashboard', '/admin/doctors', '/admin/patients', '/admin/appointments']
+
+
+def _memory_kb():
+    with open('/proc/self/smaps_rollup') as rollup:
+        fields = dict(line.split(':', 1) for line in rollup.readlines()[1:])
+    return int(fields['Rss'].split()[0]), int(fields['Pss'].split()[0])
+
+
+def _build_app():
+    from app import create_app
+    return create_app()
+
+
+def _preload_app():
+    from wsgi import app
+    return app
+
+
+def _serve(app, requests):
+    client = app.test_client()
+    client.post('/login', data={'email': 'admin@bench.test', 'password': 'password'})
+    for index in range(requests):
+        response = client.get(PAGES[index % len(PAGES)])
+        if response.status_code != 200:
+            raise RuntimeError(f'{PAGES[index % len(PAGES)]} returned {response.status_code}')
+
+
+def _worker(app, started, requests, report, release):
+    app = app or _build_app()
+    _serve(app, 1)
+    ready = time.perf_counter() - started
+    _serve(app, requests)
+    rss, pss = _memory_kb()
+    os.write(report, (json.dumps({'ready': ready, 'rss': rss, 'pss': pss}) + '\n').encode())
+    os.read(release, 1)
+
+
+def measure(mode, workers, requests):
+    started = time.perf_counter()
+    app = _preload_app() if mode == 'preload' else None
+    master_ready = time.perf_counter() - started
+
+    report_read, report_write = os.pipe()
+    release_read, release_write = os.pipe()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(report_read)
+                os.close(release_write)
+                _worker(app, started, requests, report_write, release_read)
+            except Exception as error:
+                print(f'worker failed: {error!r}', file=sys.stderr)
+                code = 1
+            os._exit(code)
+        children.append(pid)
+    os.close(report_write)
+    os.close(release_read)
+
+    with os.fdopen(report_read) as reports:
+        results = [json.loads(line) for line in (reports.readline() for _ in children) if line]
+    master_rss, master_pss = _memory_kb()
+    os.close(release_write)
+    if any(os.waitpid(pid, 0)[1] for pid in children) or len(results) != workers:
+        raise SystemExit('a worker failed')
+
+    count = len(results)
+    return {
+        'master_ready_ms': round(master_ready * 1000, 1),
+        'all_ready_ms': round(max(result['ready'] for result in results) * 1000, 1),
+        'worker_rss_mb': round(sum(result['rss'] for result in results) / count / 1024, 1),
+        'worker_pss_mb': round(sum(result['pss'] for result in results) / count / 1024, 1),
+        'total_pss_mb': round((master_pss + sum(result['pss'] for result in results)) / 1024, 1),
+    }
+
+
+def _run(command, env):
+    return subprocess.run([sys.executable, '-m', *command], env=env, check=True, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time and per-worker memory, preloaded vs per-worker app')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=40, help='requests each worker serves before reporting')
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--measure', nargs=2, metavar=('MODE', 'WORKERS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], int(args.measure[1]), args.requests)))
+        return
+
+    env = dict(os.environ, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+               DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'prefork.db'))
+    _run(['bench.seed', '--doctors', str(args.doctors), '--patients', str(args.patients),
+          '--appointments', str(args.appointments)], env)
+
+    columns = None
+    for workers in args.workers:
+        for mode in MODES:
+            output = _run(['bench.prefork_bench', '--measure', mode, str(workers), '--requests', str(args.requests)],
+                          env)
+            result = json.loads(output.strip().splitlines()[-1])
+            if columns is None:
+                columns = list(result)
+                print(f"{'mode':<12}{'workers':>8}" + ''.join(f"{column:>17}" for column in columns))
+            print(f"{mode:<12}{workers:>8}" + ''.join(f"{result[column]:>17}" for column in columns))
+    print('(worker_* columns are per-worker averages; total_pss_mb includes the master)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from flask import url_for
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app
+from models import db, User, Doctor, Patient, Appointment
+from bench.routes_bench import _sessions
+from bench.seed import seed_database
+from routes.pagination import MAX_PAGE_SIZE
+
+# List and history pages, with the role that opens them. Each must run the
+# same number of statements however many appointments there are.
+PAGES = [
+    ('admin.appointments', 'admin'),
+    ('admin.dashboard', 'admin'),
+    ('doctor.appointments', 'doctor'),
+    ('doctor.dashboard', 'doctor'),
+    ('doctor.patient_history', 'doctor'),
+    ('patient.appointments', 'patient'),
+    ('patient.history', 'patient'),
+]
+
+
+# Paginated pages show at most one page of rows whatever the table size,
+# so each page is also counted with a short and a long page.
+PAGE_SIZES = [5, MAX_PAGE_SIZE]
+
+
+# Seeds a scratch database with `appointments` rows and returns the number
+# of statements each page runs per page size, counted on a second request
+# so that cold caches do not add to the figure.
+def count_queries(appointments, patients, doctors):
+    path = os.path.join(tempfile.mkdtemp(), f'query_count_{appointments}.db')
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        seed_database(doctors=doctors, patients=patients, appointments=appointments)
+        sessions, arguments = _sessions(db, (User, Doctor, Patient, Appointment))
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    counts = {}
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        for endpoint, role in PAGES:
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session.update(sessions[role])
+            for per_page in PAGE_SIZES:
+                with app.test_request_context():
+                    values = {'patient_id': arguments['patient_id']} if endpoint == 'doctor.patient_history' else {}
+                    page = url_for(endpoint, per_page=per_page, **values)
+                client.get(page)
+                statements[0] = 0
+                response = client.get(page)
+                if response.status_code != 200:
+                    raise SystemExit(f'{endpoint} returned {response.status_code}')
+                counts[endpoint, per_page] = statements[0]
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that list and history pages run a fixed number of '
+                                                 'queries at N and 10x N appointments')
+    parser.add_argument('--appointments', type=int, default=2000)
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--doctors', type=int, default=20)
+    args = parser.parse_args()
+
+    small = count_queries(args.appointments, args.patients, args.doctors)
+    large = count_queries(args.appointments * 10, args.patients, args.doctors)
+
+    columns = [(counts, size, per_page) for counts, size in ((small, args.appointments),
+                                                             (large, args.appointments * 10))
+               for per_page in PAGE_SIZES]
+    print(f"{'page':<28}" + ''.join(f"{f'{size}/{per_page}':>14}" for _, size, per_page in columns))
+    changed = []
+    for endpoint, _ in PAGES:
+        values = [counts[endpoint, per_page] for counts, _, per_page in columns]
+        flag = '' if len(set(values)) == 1 else '  CHANGED'
+        if flag:
+            changed.append(endpoint)
+        print(f"{endpoint:<28}" + ''.join(f"{value:>14}" for value in values) + flag)
+    print('(columns are appointments/rows per page)')
+    if changed:
+        print(f"FAILED: the query count depends on the number of rows for {', '.join(changed)}")
+        sys.exit(1)
+    print('OK: every page ran the same number of queries at both sizes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Readers hit the admin dashboard and list pages while one writer keeps
+# taking the database's write lock and holding it for --hold seconds, the
+# way a long import chunk does once its changes spill out of the page cache.
+# Each profile runs in its own process because the engine profile is read
+# when the app is imported.
+READ_PATHS = ['/admin/dashboard', '/admin/appointments', '/admin/doctors', '/admin/patients']
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(readers, duration, hold):
+    from app import create_app
+    from models import db, User, Appointment
+    from bench.seed import seed_database
+    app = create_app({'TESTING': True})
+
+    with app.app_context():
+        seed_database(doctors=20, patients=500, appointments=3000, history_days=60)
+        admin = User.query.filter_by(role='admin').first()
+        admin_session = {'user_id': admin.id, 'role': 'admin', 'name': 'Bench Admin', 'email': admin.email}
+        appointment_id = db.session.query(db.func.max(Appointment.id)).scalar()
+
+    stop_at = time.perf_counter() + duration
+    latencies, errors, writes = [], [], [0]
+    lock = threading.Lock()
+
+    def writer():
+        with app.app_context():
+            while time.perf_counter() < stop_at:
+                connection = db.engine.raw_connection()
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute('BEGIN EXCLUSIVE')
+                    cursor.execute("UPDATE appointments SET status = status WHERE id = ?", (appointment_id,))
+                    time.sleep(hold)
+                    connection.commit()
+                    writes[0] += 1
+                finally:
+                    connection.close()
+                time.sleep(0.02)
+
+    def reader(index):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update(admin_session)
+        step = index
+        while time.perf_counter() < stop_at:
+            path = READ_PATHS[step % len(READ_PATHS)]
+            step += 1
+            started = time.perf_counter()
+            try:
+                status = client.get(path).status_code
+            except Exception as error:
+                status = type(error).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if status != 200:
+                    errors.append(str(status))
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'reads': len(latencies),
+        'read_errors': len(errors),
+        'writes': writes[0],
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'max_ms': round(max(latencies, default=0.0), 2),
+    }
+
+
+def run_profile(profile, args):
+    env = dict(os.environ, DATABASE_PROFILE=profile, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+               DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), f'{profile}.db'))
+    output = subprocess.run(
+        [sys.executable, '-m', 'bench.read_write_concurrency', '--measure', '--readers', str(args.readers),
+         '--duration', str(args.duration), '--hold', str(args.hold)],
+        env=env, check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reader latency while a writer holds the write lock, per engine profile')
+    parser.add_argument('--profiles', nargs='+', default=['basic', 'production'])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--hold', type=float, default=0.25, help='seconds the writer holds the lock per transaction')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.readers, args.duration, args.hold)))
+        return
+
+    print(f"{'profile':<12}{'reads':>8}{'errors':>8}{'writes':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    results = {}
+    for profile in args.profiles:
+        result = results[profile] = run_profile(profile, args)
+        print(f"{profile:<12}{result['reads']:>8}{result['read_errors']:>8}{result['writes']:>8}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['max_ms']:>10.2f}")
+
+    # With WAL a reader never waits for the write lock, so no read should take
+    # as long as one write transaction holds it.
+    production = results.get('production')
+    if production:
+        blocked = production['read_errors'] or production['p95_ms'] >= args.hold * 1000
+        print('readers blocked by the writer' if blocked else 'readers were not blocked by the writer')
+        sys.exit(1 if blocked else 0)
+
+
+if __name__ == '__main__':
+    main()
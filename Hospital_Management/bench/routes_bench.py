@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+# Mutating GET routes are left out so every iteration sees the same data,
+# and the export, which bench.export_memory measures on its own.
+SKIPPED_ENDPOINTS = {'static', 'auth.logout', 'admin.delete_doctor', 'admin.delete_patient',
+                     'doctor.cancel_appointment', 'patient.cancel_appointment', 'admin.export_appointments'}
+
+# Extra query strings benchmarked in addition to the bare route.
+VARIANTS = {
+    'admin.doctors': ['search=car'],
+    'admin.patients': ['search=sharma'],
+    'patient.doctors': ['search=dr', 'department_id=1'],
+    'patient.first_available': ['department_id=1'],
+}
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _sessions(db, models):
+    User, Doctor, Patient, Appointment = models
+    admin = User.query.filter_by(role='admin').first()
+    # The busiest doctor and patient give the heaviest realistic pages.
+    doctor_id = db.session.query(Appointment.doctor_id).group_by(Appointment.doctor_id).order_by(
+        db.func.count().desc()).limit(1).scalar()
+    patient_id = db.session.query(Appointment.patient_id).group_by(Appointment.patient_id).order_by(
+        db.func.count().desc()).limit(1).scalar()
+    doctor = db.session.get(Doctor, doctor_id)
+    patient = db.session.get(Patient, patient_id)
+    booked = Appointment.query.filter_by(doctor_id=doctor_id, status='Booked').first()
+    sessions = {
+        'admin': {'user_id': admin.id, 'role': 'admin', 'name': 'Bench Admin', 'email': admin.email},
+        'doctor': {'user_id': doctor.user_id, 'role': 'doctor', 'name': doctor.name, 'doctor_id': doctor.id},
+        'patient': {'user_id': patient.user_id, 'role': 'patient', 'name': patient.name, 'patient_id': patient.id},
+        None: {},
+    }
+    arguments = {'doctor_id': doctor.id, 'patient_id': patient.id,
+                 'appointment_id': booked.id if booked else 1}
+    return sessions, arguments
+
+
+def _role(rule):
+    for role in ('admin', 'doctor', 'patient'):
+        if rule.rule.startswith(f'/{role}/'):
+            return role
+    return None
+
+
+def collect_routes(app, arguments):
+    routes = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS or 'GET' not in rule.methods:
+            continue
+        with app.test_request_context():
+            from flask import url_for
+            path = url_for(rule.endpoint, **{name: arguments[name] for name in rule.arguments})
+        routes.append((rule.endpoint, path, _role(rule)))
+        for query in VARIANTS.get(rule.endpoint, []):
+            routes.append((f'{rule.endpoint}?{query}', f'{path}?{query}', _role(rule)))
+    return routes
+
+
+def benchmark(app, db, iterations, warmup):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from models import User, Doctor, Patient, Appointment
+
+    with app.app_context():
+        sessions, arguments = _sessions(db, (User, Doctor, Patient, Appointment))
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    results = {}
+    try:
+        for name, path, role in collect_routes(app, arguments):
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session.update(sessions[role])
+            for _ in range(warmup):
+                client.get(path)
+
+            timings = []
+            queries = []
+            status = None
+            for _ in range(iterations):
+                statements[0] = 0
+                started = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                queries.append(statements[0])
+                status = response.status_code
+
+            # Memory is measured in a separate pass: tracemalloc slows every
+            # allocation down and would distort the latency figures.
+            tracemalloc.start()
+            peak = 0
+            for _ in range(min(3, iterations)):
+                tracemalloc.reset_peak()
+                client.get(path)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            results[name] = {
+                'path': path,
+                'role': role,
+                'status': status,
+                'p50_ms': round(_percentile(timings, 50), 3),
+                'p95_ms': round(_percentile(timings, 95), 3),
+                'p99_ms': round(_percentile(timings, 99), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+                'queries': max(queries),
+                'peak_kb': round(peak / 1024, 1),
+            }
+            print(f"{name:<42}{results[name]['p50_ms']:>10.2f}{results[name]['p95_ms']:>10.2f}"
+                  f"{results[name]['p99_ms']:>10.2f}{results[name]['queries']:>9}{results[name]['peak_kb']:>11.1f}")
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    return results
+
+
+def run(args):
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'routes_bench.db')
+
+    from app import create_app
+    from models import db
+    from bench.seed import seed_database, volumes
+    app = create_app({'TESTING': True})
+
+    volume = volumes(args)
+    if not args.database:
+        with app.app_context():
+            started = time.perf_counter()
+            created = seed_database(**volume)
+            print(f"Seeded {', '.join(f'{c} {n}' for n, c in created.items())} "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'route':<42}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KB':>11}")
+    results = benchmark(app, db, args.iterations, args.warmup)
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'date': date.today().isoformat(),
+            'python': platform.python_version(),
+            'iterations': args.iterations,
+            'database': args.database or 'seeded',
+            'volumes': volume,
+        },
+        'routes': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)['routes']
+    with open(args.candidate) as f:
+        candidate = json.load(f)['routes']
+
+    print(f"{'route':<42}{'p50 before':>12}{'p50 after':>12}{'change':>9}{'queries':>12}")
+    regressions = 0
+    for name in sorted(set(baseline) | set(candidate)):
+        if name not in baseline or name not in candidate:
+            print(f"{name:<42}{'only in ' + ('candidate' if name in candidate else 'baseline'):>24}")
+            continue
+        before, after = baseline[name], candidate[name]
+        change = (after['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  slower'
+            regressions += 1
+        elif change < -args.threshold:
+            flag = '  faster'
+        print(f"{name:<42}{before['p50_ms']:>12.2f}{after['p50_ms']:>12.2f}{change:>8.1f}%"
+              f"{before['queries']:>6} -> {after['queries']:<4}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-route latency, query count and memory benchmark')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='benchmark every GET route (default)')
+    run_parser.add_argument('--iterations', type=int, default=30)
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--output', default='bench_results.json')
+    run_parser.add_argument('--database', help='benchmark an existing database instead of seeding a new one')
+    from bench.seed import add_volume_arguments
+    add_volume_arguments(run_parser)
+
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='percent change in p50 reported as slower/faster')
+
+    args = parser.parse_args(sys.argv[1:] or ['run'])
+    if args.command == 'compare':
+        sys.exit(1 if compare(args) else 0)
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
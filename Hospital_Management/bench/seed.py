@@ -0,0 +1,207 @@
+import argparse
+import random
+import time as clock
+from datetime import date, datetime, time, timedelta
+from werkzeug.security import generate_password_hash
+from models import db, User, Admin, Department, Doctor, Patient, DoctorAvailability, Appointment, Treatment
+from counters import rebuild_counters
+from roster import rebuild_roster
+from versions import bump_versions, GLOBAL_SCOPE
+
+BENCH_PASSWORD = 'password'
+
+DEPARTMENT_NAMES = [
+    'Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Dermatology', 'General Medicine',
+    'Oncology', 'Ophthalmology', 'Psychiatry', 'Radiology', 'Urology', 'Gastroenterology',
+    'Endocrinology', 'Nephrology', 'Pulmonology', 'Rheumatology', 'ENT', 'Gynecology',
+]
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Ananya', 'Vihaan', 'Saanvi', 'Arjun', 'Meera', 'Kabir', 'Riya',
+               'Rohan', 'Priya', 'Aditya', 'Kavya', 'Sameer', 'Nisha', 'Rahul', 'Pooja', 'Vikram', 'Sneha']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Nair', 'Gupta', 'Reddy', 'Patel', 'Khan', 'Das', 'Mehta',
+              'Joshi', 'Rao', 'Singh', 'Bose', 'Kulkarni', 'Menon', 'Chopra', 'Pillai', 'Saxena', 'Malhotra']
+DIAGNOSES = ['Seasonal influenza', 'Hypertension, stage 1', 'Type 2 diabetes mellitus', 'Migraine without aura',
+             'Lumbar strain', 'Allergic rhinitis', 'Atopic dermatitis', 'Iron deficiency anaemia',
+             'Acute gastroenteritis', 'Viral upper respiratory tract infection']
+PRESCRIPTIONS = ['Paracetamol 500mg TDS x 5 days', 'Amlodipine 5mg OD', 'Metformin 500mg BD',
+                 'Sumatriptan 50mg PRN', 'Ibuprofen 400mg TDS after food', 'Cetirizine 10mg HS',
+                 'Ferrous sulphate 200mg OD', 'ORS and rest, review in 3 days']
+
+SLOT_TIMES = [time(hour, minute) for hour in range(9, 17) for minute in (0, 15, 30, 45)]
+
+
+def _name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _phone(rng):
+    return f'{rng.randint(6, 9)}{rng.randint(0, 999999999):09d}'
+
+
+def _chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(connection, table, rows):
+    for chunk in _chunks(rows):
+        connection.execute(table.insert(), chunk)
+
+
+def _insert_users(connection, rows):
+    users = User.__table__
+    ids = []
+    for chunk in _chunks(rows):
+        ids.extend(connection.execute(
+            users.insert().returning(users.c.id, sort_by_parameter_order=True), chunk
+        ).scalars().all())
+    return ids
+
+
+# Fills an empty schema with synthetic data. Appointments span the past
+# `history_days` and the next `availability_days`; past ones are mostly
+# Completed (with a Treatment) or Cancelled, future ones mostly Booked.
+# Every account uses BENCH_PASSWORD.
+def seed_database(departments=6, doctors=50, patients=2000, appointments=20000,
+                  availability_days=7, history_days=365, seed=42, password_method='pbkdf2:sha256:1000'):
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(BENCH_PASSWORD, password_method)
+    counts = {}
+
+    db.create_all()
+    with db.engine.begin() as connection:
+        admin_id = _insert_users(connection, [{'email': 'admin@bench.test', 'password_hash': password_hash,
+                                               'role': 'admin', 'created_at': now, 'is_active': True}])[0]
+        _insert(connection, Admin.__table__, [{'user_id': admin_id, 'name': 'Bench Admin', 'contact': _phone(rng)}])
+
+        names = (DEPARTMENT_NAMES * (departments // len(DEPARTMENT_NAMES) + 1))[:departments]
+        department_rows = [{'name': name if i < len(DEPARTMENT_NAMES) else f'{name} {i}',
+                            'description': f'{name} department'} for i, name in enumerate(names)]
+        departments_table = Department.__table__
+        department_ids = connection.execute(
+            departments_table.insert().returning(departments_table.c.id, sort_by_parameter_order=True),
+            department_rows
+        ).scalars().all()
+
+        doctor_user_ids = _insert_users(connection, [
+            {'email': f'doctor{i}@bench.test', 'password_hash': password_hash, 'role': 'doctor',
+             'created_at': now, 'is_active': rng.random() > 0.05}
+            for i in range(doctors)
+        ])
+        doctors_table = Doctor.__table__
+        doctor_ids = connection.execute(
+            doctors_table.insert().returning(doctors_table.c.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, 'name': f'Dr. {_name(rng)}', 'department_id': rng.choice(department_ids),
+              'qualification': rng.choice(['MBBS', 'MBBS, MD', 'MBBS, MS', 'MBBS, DNB']),
+              'contact': _phone(rng), 'experience_years': rng.randint(1, 35)}
+             for user_id in doctor_user_ids]
+        ).scalars().all()
+
+        patient_user_ids = _insert_users(connection, [
+            {'email': f'patient{i}@bench.test', 'password_hash': password_hash, 'role': 'patient',
+             'created_at': now, 'is_active': rng.random() > 0.02}
+            for i in range(patients)
+        ])
+        patients_table = Patient.__table__
+        patient_ids = connection.execute(
+            patients_table.insert().returning(patients_table.c.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, 'name': _name(rng), 'age': rng.randint(1, 90),
+              'gender': rng.choice(['Male', 'Female', 'Other']), 'contact': _phone(rng),
+              'address': f'{rng.randint(1, 500)} Main Road', 'blood_group': rng.choice(['A+', 'B+', 'O+', 'AB+', 'O-'])}
+             for user_id in patient_user_ids]
+        ).scalars().all()
+
+        availability_rows = []
+        for doctor_id in doctor_ids:
+            for offset in range(availability_days):
+                if rng.random() < 0.8:
+                    start = rng.choice([8, 9, 10])
+                    availability_rows.append({
+                        'doctor_id': doctor_id, 'date': today + timedelta(days=offset),
+                        'start_time': time(start), 'end_time': time(start + rng.choice([4, 6, 8])),
+                        'is_available': True,
+                    })
+        _insert(connection, DoctorAvailability.__table__, availability_rows)
+
+        # Non-cancelled appointments must not share a doctor or patient slot.
+        doctor_slots, patient_slots = set(), set()
+        appointment_rows = []
+        attempts = 0
+        while len(appointment_rows) < appointments and attempts < appointments * 5:
+            attempts += 1
+            day = today + timedelta(days=rng.randint(-history_days, availability_days - 1))
+            slot = rng.choice(SLOT_TIMES)
+            doctor_id = rng.choice(doctor_ids)
+            patient_id = rng.choice(patient_ids)
+            roll = rng.random()
+            if day < today:
+                status = 'Completed' if roll < 0.75 else 'Cancelled' if roll < 0.95 else 'Booked'
+            else:
+                status = 'Booked' if roll < 0.9 else 'Cancelled'
+            if status != 'Cancelled':
+                if (doctor_id, day, slot) in doctor_slots or (patient_id, day, slot) in patient_slots:
+                    continue
+                doctor_slots.add((doctor_id, day, slot))
+                patient_slots.add((patient_id, day, slot))
+            created = datetime.combine(day, slot) - timedelta(days=rng.randint(1, 30))
+            appointment_rows.append({'patient_id': patient_id, 'doctor_id': doctor_id, 'appointment_date': day,
+                                     'appointment_time': slot, 'status': status, 'created_at': created})
+        appointments_table = Appointment.__table__
+        appointment_ids = []
+        for chunk in _chunks(appointment_rows):
+            appointment_ids.extend(connection.execute(
+                appointments_table.insert().returning(appointments_table.c.id, sort_by_parameter_order=True),
+                chunk
+            ).scalars().all())
+
+        treatment_rows = [
+            {'appointment_id': appointment_id, 'diagnosis': rng.choice(DIAGNOSES),
+             'prescription': rng.choice(PRESCRIPTIONS),
+             'notes': 'Review after two weeks.' if rng.random() < 0.4 else None,
+             'created_at': datetime.combine(row['appointment_date'], row['appointment_time'])}
+            for row, appointment_id in zip(appointment_rows, appointment_ids) if row['status'] == 'Completed'
+        ]
+        _insert(connection, Treatment.__table__, treatment_rows)
+
+        rebuild_counters(connection)
+        rebuild_roster(connection)
+        bump_versions(connection, GLOBAL_SCOPE)
+
+    counts.update(departments=len(department_ids), doctors=len(doctor_ids), patients=len(patient_ids),
+                  availability=len(availability_rows), appointments=len(appointment_rows),
+                  treatments=len(treatment_rows))
+    return counts
+
+
+def add_volume_arguments(parser):
+    parser.add_argument('--departments', type=int, default=6)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--availability-days', type=int, default=7)
+    parser.add_argument('--history-days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def volumes(args):
+    return {
+        'departments': args.departments, 'doctors': args.doctors, 'patients': args.patients,
+        'appointments': args.appointments, 'availability_days': args.availability_days,
+        'history_days': args.history_days, 'seed': args.seed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill an empty database with synthetic hospital data '
+                                                 '(uses DATABASE_URL, or hospital.db by default)')
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    started = clock.perf_counter()
+    with app.app_context():
+        created = seed_database(**volumes(args))
+    print(', '.join(f'{count} {name}' for name, count in created.items()))
+    print(f"Seeded in {clock.perf_counter() - started:.1f}s. Every account's password is '{BENCH_PASSWORD}'")
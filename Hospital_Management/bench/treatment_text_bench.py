@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Database size and history page latency with treatment text stored plain
+# and compressed. Each mode seeds its own database in a separate process,
+# with TEXT_COMPRESS_MIN_BYTES set in its environment, and replaces the
+# seeded one-line treatments with clinical notes of realistic length (a few
+# hundred bytes to a few KB, SOAP style).
+MODES = {'plain': '0', 'compressed': '256'}
+
+COMPLAINTS = ['intermittent chest tightness on exertion', 'productive cough and low-grade fever',
+              'pain and swelling in the right knee after a fall', 'recurrent frontal headaches with photophobia',
+              'epigastric burning after meals', 'itchy erythematous rash on both forearms',
+              'increased thirst and frequent urination', 'lower back pain radiating to the left leg']
+HISTORY = ['Known hypertensive on amlodipine for 4 years, compliant.', 'No known drug allergies.',
+           'Type 2 diabetes diagnosed 6 years ago, HbA1c 7.9% three months back.',
+           'Ex-smoker, 10 pack-years, quit 2 years ago.', 'Family history of ischaemic heart disease in father.',
+           'Appendicectomy in 2009, no other surgeries.', 'Lives with family, works as a schoolteacher.']
+EXAM = ['Alert and oriented, not in distress.', 'Chest clear on auscultation, no added sounds.',
+        'S1 S2 heard, no murmurs.', 'Abdomen soft, mild epigastric tenderness, no guarding.',
+        'Right knee: effusion present, tenderness over medial joint line, ROM painful beyond 90 degrees.',
+        'SLR positive at 40 degrees on the left, power 5/5 in all groups.', 'No pallor, icterus or oedema.']
+PLAN = ['Advised ECG and fasting lipid profile, review with reports.', 'Continue current medication.',
+        'Paracetamol 650 mg SOS for pain, not more than 4 doses a day.', 'Physiotherapy referral for 2 weeks.',
+        'Dietary advice given, reduce salt and refined sugar.', 'Red flag symptoms explained, return if worse.',
+        'Follow up in 2 weeks or earlier if needed.']
+
+
+def clinical_note(rng):
+    parts = [
+        f"S: {rng.randint(18, 80)} y/o presenting with {rng.choice(COMPLAINTS)} for {rng.randint(2, 21)} days. "
+        + ' '.join(rng.sample(HISTORY, rng.randint(2, 5))),
+        f"O: BP {rng.randint(110, 160)}/{rng.randint(70, 100)} mmHg, HR {rng.randint(60, 110)}/min, "
+        f"SpO2 {rng.randint(94, 99)}%, temp {rng.uniform(36.4, 38.6):.1f} C. "
+        + ' '.join(rng.sample(EXAM, rng.randint(2, 5))),
+        'A: ' + rng.choice(COMPLAINTS).capitalize() + ', likely benign; differentials discussed with the patient.',
+        'P: ' + ' '.join(rng.sample(PLAN, rng.randint(3, 6))),
+    ]
+    return '\n'.join(parts * rng.randint(1, 3))
+
+
+def _fill_notes(db, seed):
+    from sqlalchemy import bindparam, select
+    from models import Treatment
+    treatments = Treatment.__table__
+    rng = random.Random(seed)
+    with db.engine.begin() as connection:
+        ids = connection.execute(select(treatments.c.id)).scalars().all()
+        update = treatments.update().where(treatments.c.id == bindparam('row_id')).values(
+            notes=bindparam('notes', type_=treatments.c.notes.type),
+            prescription=bindparam('prescription', type_=treatments.c.prescription.type))
+        for start in range(0, len(ids), 5000):
+            connection.execute(update, [
+                {'row_id': row_id, 'notes': clinical_note(rng), 'prescription': ' '.join(rng.sample(PLAN, 3))}
+                for row_id in ids[start:start + 5000]
+            ])
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM')
+        connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def _timed(client, path, iterations):
+    client.get(path)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def measure(args):
+    from app import create_app
+    from models import db, Appointment, Patient
+    from bench.seed import seed_database
+    app = create_app({'TESTING': True})
+
+    with app.app_context():
+        seed_database(doctors=args.doctors, patients=args.patients, appointments=args.appointments)
+        _fill_notes(db, args.seed)
+        size = os.path.getsize(db.engine.url.database)
+        patient_id = db.session.query(Appointment.patient_id).filter(Appointment.status == 'Completed').group_by(
+            Appointment.patient_id).order_by(db.func.count().desc()).limit(1).scalar()
+        patient = db.session.get(Patient, patient_id)
+        doctor = Appointment.query.filter_by(patient_id=patient_id).first().doctor
+        sessions = {
+            'patient': {'user_id': patient.user_id, 'role': 'patient', 'name': patient.name, 'patient_id': patient.id},
+            'doctor': {'user_id': doctor.user_id, 'role': 'doctor', 'name': doctor.name, 'doctor_id': doctor.id},
+        }
+
+    results = {'db_mb': round(size / 1e6, 2)}
+    pages = [('patient_history_ms', 'patient', '/patient/history'),
+             ('doctor_history_ms', 'doctor', f'/doctor/patient_history/{patient_id}'),
+             ('doctor_appointments_ms', 'doctor', '/doctor/appointments')]
+    for name, role, path in pages:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update(sessions[role])
+        results[name] = _timed(client, path, args.iterations)
+    return results
+
+
+def run_mode(mode, args):
+    env = dict(os.environ, TEXT_COMPRESS_MIN_BYTES=MODES[mode], PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+               DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), f'{mode}.db'))
+    output = subprocess.run(
+        [sys.executable, '-m', 'bench.treatment_text_bench', '--measure', '--doctors', str(args.doctors),
+         '--patients', str(args.patients), '--appointments', str(args.appointments),
+         '--iterations', str(args.iterations), '--seed', str(args.seed)],
+        env=env, check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DB size and history page latency, plain vs compressed treatment text')
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args)))
+        return
+
+    results = {mode: run_mode(mode, args) for mode in MODES}
+    columns = list(results['plain'])
+    print(f"{'mode':<12}" + ''.join(f"{column:>24}" for column in columns))
+    for mode, result in results.items():
+        print(f"{mode:<12}" + ''.join(f"{result[column]:>24}" for column in columns))
+    print('(db_mb is the file size after VACUUM, the _ms columns are median request times)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Small in-process cache with a TTL per entry and LRU eviction. Writers call
+# invalidate(), which bumps the version: entries stored under an older
+# version are treated as misses and reloaded. The version is per process, so
+# other workers pick up a change once their copy expires. discard() drops
+# single keys instead.
+class TTLCache:
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    # Returns (True, value) on a hit. On a miss returns (False, ticket); pass
+    # the ticket to store() once the value has been loaded, or to release()
+    # if loading failed. A load already under way keeps its ticket unless it
+    # is from an older version or has run past the TTL; the later miss then
+    # loads the value without storing it.
+    def lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, version, value = entry
+                if version == self.version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            ticket = (now, self.version, object())
+            current = self._loading.get(key)
+            if current is None or current[1] != self.version or current[0] + self.ttl <= now:
+                self._loading[key] = ticket
+            return False, ticket
+
+    def store(self, key, value, ticket):
+        loaded_at, version, _ = ticket
+        with self._lock:
+            # Skip storing if someone invalidated or discarded the key while
+            # we were loading.
+            if self._loading.get(key) is not ticket:
+                return
+            del self._loading[key]
+            if version == self.version:
+                self._entries[key] = (loaded_at + self.ttl, version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def release(self, key, ticket):
+        with self._lock:
+            if self._loading.get(key) is ticket:
+                del self._loading[key]
+
+    def get_or_load(self, key, loader):
+        hit, value = self.lookup(key)
+        if hit:
+            return value
+        ticket = value
+        try:
+            value = loader()
+            self.store(key, value, ticket)
+        finally:
+            self.release(key, ticket)
+        return value
+
+    def discard(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._loading.pop(key, None)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+            self.version += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,67 @@
+import zlib
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, cast, func, or_, select
+from sqlalchemy.types import LargeBinary, Text, TypeDecorator
+
+# Values at least this many bytes long (UTF-8) are stored zlib-compressed.
+# 0 turns compression off; values already compressed still read back.
+def compress_min_bytes():
+    if has_app_context():
+        return current_app.config.get('TEXT_COMPRESS_MIN_BYTES', 256)
+    return 256
+
+
+# Text stored as a zlib BLOB once it is long enough to be worth it, and as
+# plain TEXT otherwise. SQLite keeps the storage class per value, so old
+# plain rows and new compressed ones live in the same column and both read
+# back as str. Compressed values cannot be searched with LIKE.
+class CompressedText(TypeDecorator):
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        min_bytes = compress_min_bytes()
+        if not min_bytes:
+            return value
+        encoded = value.encode('utf-8')
+        if len(encoded) < min_bytes:
+            return value
+        compressed = zlib.compress(encoded, 6)
+        return compressed if len(compressed) < len(encoded) else value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode('utf-8')
+        return value
+
+
+# Rewrites long plain-text values of `columns` through CompressedText, a
+# batch of rows per transaction. Returns the number of rows rewritten.
+def compress_existing(engine, table, columns, batch_size=500):
+    min_bytes = compress_min_bytes()
+    if not min_bytes:
+        return 0
+    long_text = or_(*[
+        (func.typeof(table.c[name]) == 'text')
+        & (func.length(cast(table.c[name], LargeBinary)) >= min_bytes)
+        for name in columns
+    ])
+    update = table.update().where(table.c.id == bindparam('row_id')).values(
+        {name: bindparam(name, type_=table.c[name].type) for name in columns}
+    )
+    rewritten, last_id = 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(table.c.id, *[table.c[name] for name in columns])
+                .where(table.c.id > last_id, long_text).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return rewritten
+            connection.execute(update, [
+                {'row_id': row.id, **{name: getattr(row, name) for name in columns}} for row in rows
+            ])
+        rewritten += len(rows)
+        last_id = rows[-1].id
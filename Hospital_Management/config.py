@@ -0,0 +1,23 @@
+import os
+
+
+# Settings read from the environment. create_app() starts from these and
+# then applies the mapping it is given, so tests and scripts can override
+# single keys without touching the environment.
+def env_config():
+    return {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production'),
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('DATABASE_URL', 'sqlite:///hospital.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DATABASE_PROFILE': os.environ.get('DATABASE_PROFILE', 'production'),
+        'DB_READ_ROUTING': os.environ.get('DB_READ_ROUTING', '1') != '0',
+        'PASSWORD_HASH_METHOD': os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        'PASSWORD_HASH_WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', 4)),
+        'SLOW_REQUEST_MS': float(os.environ.get('SLOW_REQUEST_MS', 250)),
+        'SLOW_QUERY_LOG': os.environ.get('SLOW_QUERY_LOG'),
+        'SLOT_MINUTES': int(os.environ.get('SLOT_MINUTES', 15)),
+        'ARCHIVE_AFTER_DAYS': int(os.environ.get('ARCHIVE_AFTER_DAYS', 365)),
+        'FRAGMENT_CACHE_SIZE': int(os.environ.get('FRAGMENT_CACHE_SIZE', 20000)),
+        'FRAGMENT_CACHE_ENABLED': os.environ.get('FRAGMENT_CACHE_ENABLED', '1') != '0',
+        'TEXT_COMPRESS_MIN_BYTES': int(os.environ.get('TEXT_COMPRESS_MIN_BYTES', 256)),
+    }
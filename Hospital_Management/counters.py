@@ -0,0 +1,145 @@
+from sqlalchemy import event, func, inspect, select
+from models import db, User, Doctor, Patient, Appointment, ArchivedAppointment, DashboardCounters
+
+COUNTERS_ID = 1
+
+STATUS_COUNTERS = {
+    'Booked': 'booked_appointments',
+    'Completed': 'completed_appointments',
+    'Cancelled': 'cancelled_appointments',
+}
+
+counters_table = DashboardCounters.__table__
+
+
+# Every change is applied as "column = column + delta" on the connection the
+# flush is using, so the counters commit or roll back together with the
+# rows they describe.
+def bump_counters(connection, **deltas):
+    values = {name: counters_table.c[name] + delta for name, delta in deltas.items() if delta}
+    if values:
+        connection.execute(
+            counters_table.update().where(counters_table.c.id == COUNTERS_ID).values(values)
+        )
+
+
+def _status_deltas(old_status, new_status):
+    deltas = {}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        name = STATUS_COUNTERS[new_status]
+        deltas[name] = deltas.get(name, 0) + 1
+    return deltas
+
+
+def _changed(target, attribute):
+    history = inspect(target).attrs[attribute].history
+    if not history.has_changes() or not history.deleted:
+        return None
+    return history.deleted[0], getattr(target, attribute)
+
+
+@event.listens_for(Doctor, 'after_insert')
+def _doctor_inserted(mapper, connection, target):
+    bump_counters(connection, total_doctors=1)
+
+
+@event.listens_for(Doctor, 'after_delete')
+def _doctor_deleted(mapper, connection, target):
+    bump_counters(connection, total_doctors=-1)
+
+
+@event.listens_for(Patient, 'after_insert')
+def _patient_inserted(mapper, connection, target):
+    bump_counters(connection, total_patients=1)
+
+
+@event.listens_for(Patient, 'after_delete')
+def _patient_deleted(mapper, connection, target):
+    bump_counters(connection, total_patients=-1)
+
+
+@event.listens_for(Appointment, 'after_insert')
+def _appointment_inserted(mapper, connection, target):
+    bump_counters(connection, total_appointments=1, **_status_deltas(None, target.status or 'Booked'))
+
+
+@event.listens_for(Appointment, 'after_update')
+def _appointment_updated(mapper, connection, target):
+    change = _changed(target, 'status')
+    if change and change[0] != change[1]:
+        bump_counters(connection, **_status_deltas(*change))
+
+
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_deleted(mapper, connection, target):
+    bump_counters(connection, total_appointments=-1, **_status_deltas(target.status, None))
+
+
+def _user_deltas(is_active, delta):
+    return {'active_users' if is_active else 'inactive_users': delta}
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    bump_counters(connection, **_user_deltas(target.is_active is not False, 1))
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    change = _changed(target, 'is_active')
+    if change and bool(change[0]) != bool(change[1]):
+        bump_counters(connection, active_users=1 if change[1] else -1, inactive_users=-1 if change[1] else 1)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    bump_counters(connection, **_user_deltas(target.is_active is not False, -1))
+
+
+def _count(connection, table, *criteria):
+    return connection.execute(select(func.count()).select_from(table).where(*criteria)).scalar()
+
+
+# Recomputes every counter from the source tables and replaces the row.
+# Archived appointments are counted with the live ones.
+def rebuild_counters(connection):
+    users = User.__table__
+    values = {
+        'id': COUNTERS_ID,
+        'total_doctors': _count(connection, Doctor.__table__),
+        'total_patients': _count(connection, Patient.__table__),
+        'total_appointments': 0,
+        'active_users': _count(connection, users, users.c.is_active.isnot(False)),
+        'inactive_users': _count(connection, users, users.c.is_active.is_(False)),
+    }
+    for name in STATUS_COUNTERS.values():
+        values[name] = 0
+    for appointments in (Appointment.__table__, ArchivedAppointment.__table__):
+        rows = connection.execute(
+            select(appointments.c.status, func.count()).group_by(appointments.c.status)
+        ).all()
+        for status, count in rows:
+            values['total_appointments'] += count
+            if status in STATUS_COUNTERS:
+                values[STATUS_COUNTERS[status]] += count
+
+    connection.execute(counters_table.delete().where(counters_table.c.id == COUNTERS_ID))
+    connection.execute(counters_table.insert().values(values))
+    return values
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_counters_row(target, connection, **kw):
+    exists = connection.execute(
+        select(counters_table.c.id).where(counters_table.c.id == COUNTERS_ID)
+    ).first()
+    if not exists:
+        rebuild_counters(connection)
+
+
+def get_counters():
+    return db.session.get(DashboardCounters, COUNTERS_ID) or DashboardCounters(
+        **{column.name: 0 for column in counters_table.columns}
+    )
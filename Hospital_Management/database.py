@@ -0,0 +1,146 @@
+import os
+import weakref
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+# Engine profiles. 'production' puts SQLite in WAL mode so readers keep
+# working while a write transaction is open, waits on a busy database instead
+# of failing with "database is locked", and gives GET-only views their own
+# read-only pool. 'basic' is SQLite's stock behaviour.
+ENGINE_PROFILES = {
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'busy_timeout': 5000,
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'temp_store': 'MEMORY',
+        },
+        'pool': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30},
+        'read_pool': {'pool_size': 20, 'max_overflow': 20, 'pool_timeout': 30},
+    },
+    'basic': {
+        'pragmas': {},
+        'pool': {},
+        'read_pool': None,
+    },
+}
+
+# Settings a read-only connection must not (or need not) change: the journal
+# mode is stored in the database file by the primary, and durability only
+# matters to writers.
+PRIMARY_ONLY_PRAGMAS = {'journal_mode', 'synchronous'}
+
+# Engines set up by init_engines, held weakly so an app that is no longer
+# used does not keep its pools alive.
+_engines = weakref.WeakSet()
+
+
+def _is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def _set_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return on_connect
+
+
+def _int_env(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def database_profile(app):
+    name = app.config.get('DATABASE_PROFILE', 'production')
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{name}', expected one of {', '.join(ENGINE_PROFILES)}")
+    profile = ENGINE_PROFILES[name]
+    pragmas = dict(profile['pragmas'])
+    if 'busy_timeout' in pragmas:
+        pragmas['busy_timeout'] = _int_env('DB_BUSY_TIMEOUT_MS', pragmas['busy_timeout'])
+    pool = dict(profile['pool'])
+    if pool:
+        pool['pool_size'] = _int_env('DB_POOL_SIZE', pool['pool_size'])
+    read_pool = dict(profile['read_pool']) if profile['read_pool'] is not None else None
+    if read_pool:
+        read_pool['pool_size'] = _int_env('DB_READ_POOL_SIZE', read_pool['pool_size'])
+    return pragmas, pool, read_pool
+
+
+# Applies the profile to the app config. Must run before db.init_app(app):
+# pool sizing and the replica bind are read when the engines are created.
+# Pools and the replica only apply to a SQLite file database; an in-memory
+# database is a single shared connection.
+def configure_database(app):
+    pool, read_pool = database_profile(app)[1:]
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    file_database = _is_file_sqlite(uri)
+    if file_database and pool:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(pool)
+    if file_database and read_pool and app.config.get('DB_READ_ROUTING', True):
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = dict(read_pool, url=uri)
+
+
+# Registers the per-connection PRAGMAs. Must run after db.init_app(app).
+def init_engines(app, db):
+    pragmas = database_profile(app)[0]
+    read_pragmas = {name: value for name, value in pragmas.items() if name not in PRIMARY_ONLY_PRAGMAS}
+    read_pragmas['query_only'] = 'ON'
+    with app.app_context():
+        engines = db.engines
+        if pragmas:
+            event.listen(engines[None], 'connect', _set_pragmas(pragmas))
+        if REPLICA_BIND in engines:
+            event.listen(engines[REPLICA_BIND], 'connect', _set_pragmas(read_pragmas))
+            # WAL is a property of the database file; switch it over once here
+            # so the first replica connection never sees the old journal mode.
+            if os.path.exists(engines[None].url.database):
+                with engines[None].connect():
+                    pass
+                engines[None].dispose()
+        _engines.update(engines.values())
+
+
+# A forked worker must never use a connection opened by its parent. The
+# child drops the inherited pools without closing the parent's connections
+# and opens its own on first use.
+def _dispose_engines_in_child():
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_in_child)
+
+
+# Reads inside a view marked with @read_replica go to the replica pool.
+# Flushes, UPDATE/INSERT/DELETE statements and any request not marked stay on
+# the primary, so a view that does end up writing still works.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and has_request_context() and g.get('read_replica')):
+            engines = self._db.engines
+            if REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,44 @@
+from flask import has_request_context, request
+from jinja2 import nodes
+from jinja2.ext import Extension
+from cache import TTLCache
+
+# Rendered template fragments. Keys carry the row versions, so a changed row
+# simply misses and old renders age out of the LRU; the TTL only bounds how
+# long an unused fragment is kept.
+fragment_cache = TTLCache(maxsize=20000, ttl=3600)
+
+
+# {% cache 'name', row.id, row.version_id %}...{% endcache %}
+#
+# Renders the body once per distinct key and serves the stored HTML after
+# that. The key is the template name, the script root (links in the body
+# depend on it) and the listed values, which must include everything the
+# body shows that can change.
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_enabled=True)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [nodes.Const(parser.name), nodes.Tuple(key, 'load')])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, template_name, key, caller):
+        if not self.environment.fragment_cache_enabled:
+            return caller()
+        script_root = request.script_root if has_request_context() else ''
+        return fragment_cache.get_or_load((template_name, script_root) + key, caller)
+
+
+def init_fragment_cache(app):
+    fragment_cache.maxsize = app.config.get('FRAGMENT_CACHE_SIZE', fragment_cache.maxsize)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache_enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
@@ -0,0 +1,340 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice, repeat
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from models import db, User, Doctor, Patient, Department, DoctorAvailability, Appointment, Treatment, ImportProgress
+from utils import validate_email, validate_phone, normalize_email
+from counters import rebuild_counters
+from roster import rebuild_roster
+from versions import bump_versions, GLOBAL_SCOPE
+from app import create_app
+
+STATUSES = ('Booked', 'Completed', 'Cancelled')
+
+progress = ImportProgress.__table__
+
+
+def read_records(path):
+    if path.endswith(('.ndjson', '.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def _text(record, field, required=True):
+    value = record.get(field)
+    value = value.strip() if isinstance(value, str) else value
+    if required and not value:
+        raise ValueError(f'missing {field}')
+    return value or None
+
+
+def _int(record, field):
+    value = _text(record, field, required=False)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        raise ValueError(f'{field} must be a number') from None
+
+
+def _date(record, field):
+    try:
+        return datetime.strptime(_text(record, field), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{field} must be YYYY-MM-DD') from None
+
+
+def _time(record, field):
+    value = _text(record, field)
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            pass
+    raise ValueError(f'{field} must be HH:MM')
+
+
+def _person(record):
+    email = normalize_email(_text(record, 'email'))
+    if not validate_email(email):
+        raise ValueError('invalid email format')
+    contact = _text(record, 'contact', required=False)
+    if contact and not validate_phone(contact):
+        raise ValueError('phone number must be exactly 10 digits')
+    return {
+        'email': email,
+        'password': _text(record, 'password'),
+        'name': _text(record, 'name'),
+        'contact': contact,
+    }
+
+
+def parse_patient(record, lookups):
+    row = _person(record)
+    row.update(age=_int(record, 'age'), gender=_text(record, 'gender', required=False),
+               address=_text(record, 'address', required=False),
+               blood_group=_text(record, 'blood_group', required=False))
+    return row
+
+
+def parse_doctor(record, lookups):
+    row = _person(record)
+    department = _text(record, 'department')
+    if department.lower() not in lookups['departments']:
+        raise ValueError(f'unknown department {department}')
+    row.update(department_id=lookups['departments'][department.lower()],
+               qualification=_text(record, 'qualification', required=False),
+               experience_years=_int(record, 'experience_years'))
+    return row
+
+
+def parse_availability(record, lookups):
+    row = {
+        'doctor_email': normalize_email(_text(record, 'doctor_email')),
+        'date': _date(record, 'date'),
+        'start_time': _time(record, 'start_time'),
+        'end_time': _time(record, 'end_time'),
+    }
+    if row['start_time'] >= row['end_time']:
+        raise ValueError('start_time must be before end_time')
+    return row
+
+
+def parse_appointment(record, lookups):
+    status = _text(record, 'status', required=False) or 'Booked'
+    if status not in STATUSES:
+        raise ValueError(f'status must be one of {", ".join(STATUSES)}')
+    return {
+        'patient_email': normalize_email(_text(record, 'patient_email')),
+        'doctor_email': normalize_email(_text(record, 'doctor_email')),
+        'appointment_date': _date(record, 'date'),
+        'appointment_time': _time(record, 'time'),
+        'status': status,
+        'diagnosis': _text(record, 'diagnosis', required=False),
+        'prescription': _text(record, 'prescription', required=False),
+        'notes': _text(record, 'notes', required=False),
+    }
+
+
+def _profile_ids(connection, model, emails):
+    rows = connection.execute(
+        select(User.email, model.id).join(model, model.user_id == User.id).where(User.email.in_(emails))
+    ).all()
+    return dict(rows)
+
+
+# Patients and doctors: new accounts only (emails already in the database are
+# skipped, which also makes re-running a partly imported file safe).
+# Passwords are hashed on the process pool, then users and profiles are
+# inserted with one executemany each.
+def insert_people(connection, rows, role, profile_table, profile_fields, pool, method):
+    emails = [row['email'] for row in rows]
+    existing = set(connection.execute(select(User.email).where(User.email.in_(emails))).scalars())
+    fresh, seen = [], set()
+    for row in rows:
+        if row['email'] not in existing and row['email'] not in seen:
+            seen.add(row['email'])
+            fresh.append(row)
+    if not fresh:
+        return 0, len(rows)
+
+    passwords = [row['password'] for row in fresh]
+    if pool:
+        hashes = list(pool.map(generate_password_hash, passwords, repeat(method),
+                               chunksize=max(1, len(passwords) // 32)))
+    else:
+        hashes = [generate_password_hash(password, method) for password in passwords]
+
+    now = datetime.utcnow()
+    users = User.__table__
+    user_ids = connection.execute(
+        users.insert().returning(users.c.id, sort_by_parameter_order=True),
+        [{'email': row['email'], 'password_hash': hashed, 'role': role, 'created_at': now, 'is_active': True}
+         for row, hashed in zip(fresh, hashes)]
+    ).scalars().all()
+    connection.execute(profile_table.insert(), [
+        dict({field: row[field] for field in profile_fields}, user_id=user_id)
+        for row, user_id in zip(fresh, user_ids)
+    ])
+    return len(fresh), len(rows) - len(fresh)
+
+
+def insert_patients(connection, rows, pool, method):
+    return insert_people(connection, rows, 'patient', Patient.__table__,
+                         ('name', 'age', 'gender', 'contact', 'address', 'blood_group'), pool, method)
+
+
+def insert_doctors(connection, rows, pool, method):
+    return insert_people(connection, rows, 'doctor', Doctor.__table__,
+                         ('name', 'department_id', 'qualification', 'contact', 'experience_years'), pool, method)
+
+
+def insert_availability(connection, rows, pool, method):
+    doctors = _profile_ids(connection, Doctor, {row['doctor_email'] for row in rows})
+    values = [
+        {'doctor_id': doctors[row['doctor_email']], 'date': row['date'],
+         'start_time': row['start_time'], 'end_time': row['end_time'], 'is_available': True}
+        for row in rows if row['doctor_email'] in doctors
+    ]
+    if values:
+        connection.execute(DoctorAvailability.__table__.insert(), values)
+    return len(values), len(rows) - len(values)
+
+
+def _insert_appointment_rows(connection, rows):
+    appointments = Appointment.__table__
+    now = datetime.utcnow()
+    ids = connection.execute(
+        appointments.insert().returning(appointments.c.id, sort_by_parameter_order=True),
+        [{'patient_id': row['patient_id'], 'doctor_id': row['doctor_id'],
+          'appointment_date': row['appointment_date'], 'appointment_time': row['appointment_time'],
+          'status': row['status'], 'created_at': now} for row in rows]
+    ).scalars().all()
+    treatments = [
+        {'appointment_id': appointment_id, 'diagnosis': row['diagnosis'],
+         'prescription': row['prescription'], 'notes': row['notes'], 'created_at': now}
+        for row, appointment_id in zip(rows, ids)
+        if row['diagnosis'] or row['prescription'] or row['notes']
+    ]
+    if treatments:
+        connection.execute(Treatment.__table__.insert(), treatments)
+
+
+def insert_appointments(connection, rows, pool, method):
+    patients = _profile_ids(connection, Patient, {row['patient_email'] for row in rows})
+    doctors = _profile_ids(connection, Doctor, {row['doctor_email'] for row in rows})
+    resolved = []
+    for row in rows:
+        if row['patient_email'] in patients and row['doctor_email'] in doctors:
+            resolved.append(dict(row, patient_id=patients[row['patient_email']],
+                                 doctor_id=doctors[row['doctor_email']]))
+    if not resolved:
+        return 0, len(rows)
+    try:
+        with connection.begin_nested():
+            _insert_appointment_rows(connection, resolved)
+        return len(resolved), len(rows) - len(resolved)
+    except IntegrityError:
+        pass
+    # Some row clashes with an active slot; fall back to row by row so only
+    # the clashing rows are skipped.
+    inserted = 0
+    for row in resolved:
+        try:
+            with connection.begin_nested():
+                _insert_appointment_rows(connection, [row])
+            inserted += 1
+        except IntegrityError:
+            print(f"  skipped {row['doctor_email']} {row['appointment_date']} {row['appointment_time']}: slot already booked",
+                  file=sys.stderr)
+    return inserted, len(rows) - inserted
+
+
+KINDS = {
+    'patients': (parse_patient, insert_patients),
+    'doctors': (parse_doctor, insert_doctors),
+    'availability': (parse_availability, insert_availability),
+    'appointments': (parse_appointment, insert_appointments),
+}
+
+
+def _load_checkpoint(connection, path, kind):
+    return connection.execute(
+        select(progress.c.records_done).where(progress.c.path == path, progress.c.kind == kind)
+    ).scalar() or 0
+
+
+def _save_checkpoint(connection, path, kind, records_done):
+    statement = insert(progress).values(path=path, kind=kind, records_done=records_done,
+                                        updated_at=datetime.utcnow())
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=['path'],
+        set_={'kind': statement.excluded.kind, 'records_done': statement.excluded.records_done,
+              'updated_at': statement.excluded.updated_at}
+    ))
+
+
+# Streams the file in chunks of batch_size records. Each chunk is validated,
+# then inserted in its own transaction together with the number of records
+# consumed (the import_progress row for the file), so an interrupted import
+# resumes after the last committed chunk and never inserts a chunk twice.
+def import_data(kind, path, batch_size=1000, workers=None, restart=False, app=None):
+    app = app or create_app()
+    parse, insert_rows = KINDS[kind]
+    checkpoint_path = os.path.abspath(path)
+
+    imported = skipped = rejected = 0
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if kind in ('patients', 'doctors') and workers != 0 else None
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as connection:
+            records_done = 0 if restart else _load_checkpoint(connection, checkpoint_path, kind)
+        if records_done:
+            print(f"Resuming {kind} import after record {records_done}")
+        method = app.config['PASSWORD_HASH_METHOD']
+        lookups = {'departments': {
+            name.lower(): dept_id for dept_id, name in db.session.execute(select(Department.id, Department.name))
+        }}
+        records = islice(read_records(path), records_done, None)
+        try:
+            while True:
+                chunk = list(islice(records, batch_size))
+                if not chunk:
+                    break
+                rows = []
+                for offset, record in enumerate(chunk, start=records_done + 1):
+                    try:
+                        rows.append(parse(record, lookups))
+                    except (ValueError, AttributeError) as error:
+                        rejected += 1
+                        print(f"  record {offset} rejected: {error}", file=sys.stderr)
+
+                with db.engine.begin() as connection:
+                    done, not_done = insert_rows(connection, rows, pool, method) if rows else (0, 0)
+                    _save_checkpoint(connection, checkpoint_path, kind, records_done + len(chunk))
+                imported += done
+                skipped += not_done
+                records_done += len(chunk)
+                elapsed = time.perf_counter() - started
+                print(f"  {records_done} records read, {imported} imported ({imported / elapsed:.0f} rows/sec)")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        with db.engine.begin() as connection:
+            rebuild_counters(connection)
+            rebuild_roster(connection)
+            bump_versions(connection, GLOBAL_SCOPE)
+            connection.execute(delete(progress).where(progress.c.path == checkpoint_path))
+
+    elapsed = time.perf_counter() - started
+    print(f"Imported {imported} {kind} in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f} rows/sec), "
+          f"{skipped} skipped, {rejected} rejected")
+    return imported, skipped, rejected
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import hospital data from CSV or NDJSON')
+    parser.add_argument('kind', choices=sorted(KINDS))
+    parser.add_argument('path', help='.csv, .ndjson or .jsonl file')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='password hashing processes (default: CPU count, 0 hashes inline)')
+    parser.add_argument('--restart', action='store_true', help='ignore any saved checkpoint')
+    args = parser.parse_args()
+    import_data(args.kind, args.path, args.batch_size, args.workers, args.restart)
@@ -1,8 +1,9 @@
 from models import db, User, Admin, Department
-from app import app
+from app import create_app
 from datetime import datetime
 
-def init_database():
+def init_database(app=None):
+    app = app or create_app()
     with app.app_context():
         db.create_all()
         
@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+
+slow_query_logger = logging.getLogger('hospital.slow_queries')
+
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _redact(parameters):
+    # Keep the shape of the parameters (how many, of what type) but never
+    # their values, which can be patient names, contacts or password hashes.
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(value) if isinstance(value, (list, tuple, dict)) else type(value).__name__
+                for value in parameters]
+    return type(parameters).__name__
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# Rolling window of the last `window` requests per endpoint.
+class EndpointMetrics:
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._slowest = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration_ms, queries, db_ms, slowest):
+        with self._lock:
+            samples = self._samples.setdefault(endpoint, deque(maxlen=self.window))
+            samples.append((duration_ms, queries, db_ms))
+            self._totals[endpoint] = self._totals.get(endpoint, 0) + 1
+            if slowest and slowest['ms'] > self._slowest.get(endpoint, {}).get('ms', -1):
+                self._slowest[endpoint] = slowest
+
+    def snapshot(self):
+        with self._lock:
+            items = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            slowest = dict(self._slowest)
+            totals = dict(self._totals)
+
+        report = {}
+        for endpoint, samples in sorted(items.items()):
+            durations = sorted(sample[0] for sample in samples)
+            buckets = {}
+            for bound in HISTOGRAM_BUCKETS_MS:
+                buckets[f'le_{bound}'] = sum(1 for d in durations if d <= bound)
+            buckets['le_inf'] = len(durations)
+            report[endpoint] = {
+                'requests_total': totals[endpoint],
+                'window': len(samples),
+                'p50_ms': round(_percentile(durations, 50), 3),
+                'p95_ms': round(_percentile(durations, 95), 3),
+                'p99_ms': round(_percentile(durations, 99), 3),
+                'max_ms': round(durations[-1], 3),
+                'queries_mean': round(sum(s[1] for s in samples) / len(samples), 2),
+                'queries_max': max(s[1] for s in samples),
+                'db_ms_mean': round(sum(s[2] for s in samples) / len(samples), 3),
+                'histogram_ms': buckets,
+                'slowest_statement': slowest.get(endpoint),
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._slowest.clear()
+            self._totals.clear()
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['query_started'].pop()) * 1000
+    if not has_request_context() or 'sql_stats' not in g:
+        return
+    stats = g.sql_stats
+    stats['queries'] += 1
+    stats['db_ms'] += elapsed_ms
+    if stats['slowest'] is None or elapsed_ms > stats['slowest']['ms']:
+        stats['slowest'] = {'ms': round(elapsed_ms, 3), 'statement': statement,
+                            'parameters': _redact(parameters)}
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        started = context.connection.info.get('query_started')
+        if started:
+            started.pop()
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {'queries': 0, 'db_ms': 0.0, 'slowest': None}
+
+
+def _finish_request(response):
+    if 'sql_stats' not in g:
+        return response
+    duration_ms = (time.perf_counter() - g.request_started) * 1000
+    stats = g.sql_stats
+    endpoint = request.endpoint or 'unmatched'
+    endpoint_metrics.record(endpoint, duration_ms, stats['queries'], stats['db_ms'], stats['slowest'])
+
+    if duration_ms >= current_app.config.get('SLOW_REQUEST_MS', 250):
+        slow_query_logger.warning(json.dumps({
+            'event': 'slow_request',
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'queries': stats['queries'],
+            'db_ms': round(stats['db_ms'], 3),
+            'slowest_statement': stats['slowest'],
+        }))
+    return response
+
+
+# Hooks SQL timing into every engine the app uses and wraps each request to
+# collect its query count, total DB time and slowest statement.
+def init_instrumentation(app, db):
+    endpoint_metrics.window = app.config.get('METRICS_WINDOW', 1000)
+    log_path = app.config.get('SLOW_QUERY_LOG')
+    if log_path and not slow_query_logger.handlers:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.WARNING)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,61 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+from models import db, Treatment, ArchivedTreatment
+from compression import compress_existing
+from app import create_app
+
+
+# Brings an existing hospital.db up to the current models in place: new
+# tables are created, missing nullable columns are added and any declared
+# index that is not in the database yet is built. Safe to run repeatedly.
+def migrate_database(app=None):
+    app = app or create_app()
+    with app.app_context():
+        db.create_all()
+
+        with db.engine.begin() as connection:
+            inspector = inspect(connection)
+            for table in db.metadata.sorted_tables:
+                existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing_columns:
+                        ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                        print(f"Added column {table.name}.{column.name}")
+
+                existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing_indexes:
+                        try:
+                            with connection.begin_nested():
+                                index.create(connection)
+                            print(f"Created index {index.name}")
+                        except IntegrityError:
+                            print(f"Could not create unique index {index.name}: existing rows conflict, resolve them and re-run")
+
+            # Login and registration look emails up lowercased; addresses
+            # that would then clash with another account are left as they are.
+            lowered = connection.execute(text(
+                'UPDATE users SET email = lower(email) WHERE email != lower(email) AND lower(email) IN '
+                '(SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) = 1)'
+            )).rowcount
+            if lowered:
+                print(f"Lowercased {lowered} user emails")
+            clashing = connection.execute(text(
+                'SELECT count(*) FROM users WHERE email != lower(email)'
+            )).scalar()
+            if clashing:
+                print(f"{clashing} user emails differ from another account only in case, resolve them and re-run")
+
+            connection.execute(text('ANALYZE'))
+
+        for model in (Treatment, ArchivedTreatment):
+            rewritten = compress_existing(db.engine, model.__table__, ['diagnosis', 'prescription', 'notes'])
+            if rewritten:
+                print(f"Compressed long text in {rewritten} {model.__tablename__} rows")
+
+        print("Database migrated successfully")
+
+if __name__ == '__main__':
+    migrate_database()
@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password, needs_rehash
+from database import RoutingSession
+from compression import CompressedText
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -14,16 +16,19 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 
 class Admin(db.Model):
     __tablename__ = 'admins'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     contact = db.Column(db.String(15))
     
@@ -35,6 +40,7 @@ class Department(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text)
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     doctors = db.relationship('Doctor', backref='department', lazy=True)
 
@@ -42,12 +48,13 @@ class Department(db.Model):
 class Doctor(db.Model):
     __tablename__ = 'doctors'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False, index=True)
     qualification = db.Column(db.String(200))
     contact = db.Column(db.String(15))
     experience_years = db.Column(db.Integer)
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     user = db.relationship('User', backref=db.backref('doctor', uselist=False))
     appointments = db.relationship('Appointment', backref='doctor', lazy=True)
@@ -56,6 +63,10 @@ class Doctor(db.Model):
 
 class DoctorAvailability(db.Model):
     __tablename__ = 'doctor_availability'
+    __table_args__ = (
+        db.Index('ix_doctor_availability_doctor_date', 'doctor_id', 'date'),
+        db.Index('ix_doctor_availability_date', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -64,16 +75,49 @@ class DoctorAvailability(db.Model):
     is_available = db.Column(db.Boolean, default=True)
 
 
+# A doctor's usual hours on one weekday (0 = Monday), optionally limited to
+# the dates between valid_from and valid_until.
+class ScheduleRule(db.Model):
+    __tablename__ = 'schedule_rules'
+    __table_args__ = (
+        db.Index('ix_schedule_rules_doctor_weekday', 'doctor_id', 'weekday'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    valid_from = db.Column(db.Date)
+    valid_until = db.Column(db.Date)
+
+
+# Dates on which the weekly rules do not apply: leave when start_time is
+# empty, otherwise these hours replace the usual ones.
+class ScheduleException(db.Model):
+    __tablename__ = 'schedule_exceptions'
+    __table_args__ = (
+        db.Index('ix_schedule_exceptions_doctor_dates', 'doctor_id', 'start_date', 'end_date'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.Time)
+    end_time = db.Column(db.Time)
+    reason = db.Column(db.String(200))
+
+
 class Patient(db.Model):
     __tablename__ = 'patients'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer)
     gender = db.Column(db.String(10))
     contact = db.Column(db.String(15))
     address = db.Column(db.Text)
     blood_group = db.Column(db.String(5))
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     user = db.relationship('User', backref=db.backref('patient', uselist=False))
     appointments = db.relationship('Appointment', backref='patient', lazy=True)
@@ -81,21 +125,121 @@ class Patient(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_doctor_slot', 'doctor_id', 'appointment_date', 'appointment_time'),
+        db.Index('ix_appointments_patient_slot', 'patient_id', 'appointment_date', 'appointment_time'),
+        db.Index('ix_appointments_date_id', 'appointment_date', 'id'),
+        db.Index('ix_appointments_status_date', 'status', 'appointment_date'),
+        # A slot can only be held by one active (non-cancelled) appointment,
+        # for the doctor and for the patient. Enforced by the database so
+        # concurrent bookings cannot both succeed.
+        db.Index('uq_appointments_doctor_slot_active', 'doctor_id', 'appointment_date', 'appointment_time',
+                 unique=True, sqlite_where=db.text("status != 'Cancelled'")),
+        db.Index('uq_appointments_patient_slot_active', 'patient_id', 'appointment_date', 'appointment_time',
+                 unique=True, sqlite_where=db.text("status != 'Cancelled'")),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
     appointment_date = db.Column(db.Date, nullable=False)
     appointment_time = db.Column(db.Time, nullable=False)
     status = db.Column(db.String(20), default='Booked')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    version_id = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     treatment = db.relationship('Treatment', backref='appointment', uselist=False)
 
 
 class Treatment(db.Model):
     __tablename__ = 'treatments'
     id = db.Column(db.Integer, primary_key=True)
-    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False)
-    diagnosis = db.Column(db.Text)
-    prescription = db.Column(db.Text)
-    notes = db.Column(db.Text)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False, index=True)
+    # The clinical text is only loaded where it is shown: queries for the
+    # history pages undefer the 'text' group, everything else gets a
+    # Treatment without it.
+    diagnosis = db.deferred(db.Column(CompressedText), group='text')
+    prescription = db.deferred(db.Column(CompressedText), group='text')
+    notes = db.deferred(db.Column(CompressedText), group='text')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Completed and cancelled appointments older than the archive cutoff, moved
+# here with their treatments by archive.py. Appointments keep their ids, so
+# links and exports refer to the same appointment before and after.
+class ArchivedAppointment(db.Model):
+    __tablename__ = 'appointments_archive'
+    __table_args__ = (
+        db.Index('ix_appointments_archive_patient_date', 'patient_id', 'appointment_date'),
+        db.Index('ix_appointments_archive_doctor_date', 'doctor_id', 'appointment_date'),
+        db.Index('ix_appointments_archive_date_id', 'appointment_date', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
+    appointment_date = db.Column(db.Date, nullable=False)
+    appointment_time = db.Column(db.Time, nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    patient = db.relationship('Patient')
+    doctor = db.relationship('Doctor')
+    treatment = db.relationship('ArchivedTreatment', uselist=False)
+
+
+class ArchivedTreatment(db.Model):
+    __tablename__ = 'treatments_archive'
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments_archive.id'), nullable=False, index=True)
+    diagnosis = db.deferred(db.Column(CompressedText), group='text')
+    prescription = db.deferred(db.Column(CompressedText), group='text')
+    notes = db.deferred(db.Column(CompressedText), group='text')
+    created_at = db.Column(db.DateTime)
+
+
+# One row per doctor and patient who have had any appointment together,
+# kept up to date by the events in roster.py. last_visit and visit_count
+# only count completed appointments.
+class DoctorPatient(db.Model):
+    __tablename__ = 'doctor_patients'
+    __table_args__ = (
+        db.Index('ix_doctor_patients_doctor_recent', 'doctor_id', 'last_visit', 'first_seen'),
+    )
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), primary_key=True)
+    first_seen = db.Column(db.Date, nullable=False)
+    last_visit = db.Column(db.Date)
+    visit_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    patient = db.relationship('Patient')
+
+
+# One row per change scope ('appointments', 'doctor:<id>', ...), bumped by
+# the model events in versions.py. Pages build their ETags from these.
+class ChangeVersion(db.Model):
+    __tablename__ = 'change_versions'
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Resume points of bulk imports (import_data.py), one row per source file.
+# Each row is written in the transaction of the chunk it counts.
+class ImportProgress(db.Model):
+    __tablename__ = 'import_progress'
+    path = db.Column(db.String(500), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    records_done = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Single-row table (id = 1) of running totals for the admin dashboard,
+# maintained by the model events in counters.py.
+class DashboardCounters(db.Model):
+    __tablename__ = 'dashboard_counters'
+    id = db.Column(db.Integer, primary_key=True)
+    total_doctors = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_patients = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_appointments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    booked_appointments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed_appointments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cancelled_appointments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    active_users = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    inactive_users = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+DEFAULT_HASH_METHOD = 'scrypt'
+DEFAULT_HASH_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def hash_method():
+    return _setting('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+
+# werkzeug stores the fully spelled-out method in the hash ("scrypt" is saved
+# as "scrypt:32768:8:1"), so the configured method is expanded the same way
+# before comparing it with a stored hash.
+def normalize_method(method):
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+def needs_rehash(password_hash, method=None):
+    return password_hash.split('$', 1)[0] != normalize_method(method or hash_method())
+
+
+# Key derivation is CPU-bound but hashlib releases the GIL while it runs, so
+# a small shared pool both keeps the work off the request thread and caps
+# how many hashes run at once. PASSWORD_HASH_WORKERS = 0 hashes inline.
+def _forget_executor():
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+# Threads do not survive fork(), so a forked worker starts its own pool.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+def _run(function, *args):
+    workers = _setting('PASSWORD_HASH_WORKERS', DEFAULT_HASH_WORKERS)
+    if not workers:
+        return function(*args)
+    global _executor
+    if _executor is None or _executor._max_workers != workers:
+        with _executor_lock:
+            if _executor is None or _executor._max_workers != workers:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor.submit(function, *args).result()
+
+
+def hash_password(password, method=None):
+    return _run(generate_password_hash, password, method or hash_method())
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
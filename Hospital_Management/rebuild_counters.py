@@ -0,0 +1,17 @@
+from models import db
+from app import create_app
+from counters import rebuild_counters
+
+
+def reconcile_counters(app=None):
+    app = app or create_app()
+    with app.app_context():
+        with db.engine.begin() as connection:
+            values = rebuild_counters(connection)
+        for name, value in values.items():
+            if name != 'id':
+                print(f"{name}: {value}")
+        print("Dashboard counters rebuilt successfully")
+
+if __name__ == '__main__':
+    reconcile_counters()
@@ -0,0 +1,14 @@
+from models import db
+from app import create_app
+from roster import rebuild_roster
+
+
+def reconcile_roster(app=None):
+    app = app or create_app()
+    with app.app_context():
+        with db.engine.begin() as connection:
+            count = rebuild_roster(connection)
+        print(f"Doctor-patient roster rebuilt: {count} entries")
+
+if __name__ == '__main__':
+    reconcile_roster()
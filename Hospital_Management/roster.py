@@ -0,0 +1,112 @@
+from sqlalchemy import case, event, func, inspect, select, union_all
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Appointment, ArchivedAppointment, DoctorPatient, Patient
+
+roster_table = DoctorPatient.__table__
+
+
+# New appointments are folded into the doctor's roster with one upsert on
+# the connection the flush is using, so the roster commits or rolls back
+# together with the appointment.
+def add_to_roster(connection, doctor_id, patient_id, appointment_date, completed):
+    statement = insert(roster_table).values(
+        doctor_id=doctor_id, patient_id=patient_id, first_seen=appointment_date,
+        last_visit=appointment_date if completed else None, visit_count=1 if completed else 0
+    )
+    updates = {'first_seen': func.min(roster_table.c.first_seen, statement.excluded.first_seen)}
+    if completed:
+        updates['last_visit'] = func.max(func.coalesce(roster_table.c.last_visit, appointment_date), appointment_date)
+        updates['visit_count'] = roster_table.c.visit_count + 1
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=['doctor_id', 'patient_id'], set_=updates
+    ))
+
+
+# Aggregates the roster from the live and archived appointments, for every
+# pair or only the given one.
+def _roster_select(doctor_id=None, patient_id=None):
+    parts = []
+    for table in (Appointment.__table__, ArchivedAppointment.__table__):
+        part = select(table.c.doctor_id, table.c.patient_id, table.c.appointment_date, table.c.status)
+        if doctor_id is not None:
+            part = part.where(table.c.doctor_id == doctor_id, table.c.patient_id == patient_id)
+        parts.append(part)
+    appointments = union_all(*parts).subquery()
+    completed = appointments.c.status == 'Completed'
+    return select(
+        appointments.c.doctor_id, appointments.c.patient_id,
+        func.min(appointments.c.appointment_date),
+        func.max(case((completed, appointments.c.appointment_date))),
+        func.count(case((completed, 1)))
+    ).group_by(appointments.c.doctor_id, appointments.c.patient_id)
+
+
+def _insert_from_select(connection, statement):
+    connection.execute(roster_table.insert().from_select(
+        ['doctor_id', 'patient_id', 'first_seen', 'last_visit', 'visit_count'], statement
+    ))
+
+
+# Recomputes one pair from its appointments (removing it if none are left).
+def refresh_roster_entry(connection, doctor_id, patient_id):
+    connection.execute(roster_table.delete().where(
+        roster_table.c.doctor_id == doctor_id, roster_table.c.patient_id == patient_id
+    ))
+    _insert_from_select(connection, _roster_select(doctor_id, patient_id))
+
+
+# Recomputes the whole roster; used after bulk loads and by rebuild_roster.py.
+def rebuild_roster(connection):
+    connection.execute(roster_table.delete())
+    _insert_from_select(connection, _roster_select())
+    return connection.execute(select(func.count()).select_from(roster_table)).scalar()
+
+
+# The doctor's patients, most recently seen first (patients who have only
+# booked so far come last), as (Patient, DoctorPatient) rows.
+def doctor_roster(doctor_id):
+    return db.session.query(Patient, DoctorPatient).join(
+        Patient, Patient.id == DoctorPatient.patient_id
+    ).filter(DoctorPatient.doctor_id == doctor_id).order_by(
+        DoctorPatient.last_visit.desc(), DoctorPatient.first_seen.desc()
+    ).all()
+
+
+@event.listens_for(Appointment, 'after_insert')
+def _appointment_inserted(mapper, connection, target):
+    add_to_roster(connection, target.doctor_id, target.patient_id, target.appointment_date,
+                  target.status == 'Completed')
+
+
+# Completing a booking is the common case and is applied incrementally.
+# Anything else that can change a pair's figures (un-completing, moving an
+# appointment to another date, doctor or patient) recomputes the pairs
+# involved. Cancelling a booking changes nothing.
+@event.listens_for(Appointment, 'after_update')
+def _appointment_updated(mapper, connection, target):
+    state = inspect(target)
+    old = {}
+    for name in ('doctor_id', 'patient_id', 'appointment_date', 'status'):
+        history = state.attrs[name].history
+        old[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    moved = any(old[name] != getattr(target, name) for name in ('doctor_id', 'patient_id', 'appointment_date'))
+
+    if not moved and old['status'] != 'Completed' and target.status == 'Completed':
+        add_to_roster(connection, target.doctor_id, target.patient_id, target.appointment_date, True)
+    elif moved or old['status'] == 'Completed' and target.status != 'Completed':
+        refresh_roster_entry(connection, target.doctor_id, target.patient_id)
+        if (old['doctor_id'], old['patient_id']) != (target.doctor_id, target.patient_id):
+            refresh_roster_entry(connection, old['doctor_id'], old['patient_id'])
+
+
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_deleted(mapper, connection, target):
+    refresh_roster_entry(connection, target.doctor_id, target.patient_id)
+
+
+# A roster table added to an existing database is filled from its
+# appointments when it is created.
+@event.listens_for(db.metadata, 'after_create')
+def _fill_new_roster(target, connection, **kw):
+    if not connection.execute(select(roster_table.c.doctor_id).limit(1)).first():
+        rebuild_roster(connection)
@@ -1,43 +1,46 @@
-from flask import render_template, request, redirect, url_for, session, flash
-from models import db, User, Admin, Doctor, Patient, Appointment
-from utils import role_required
+from datetime import date
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, Response, stream_with_context
+from models import db, User, Admin, Department, Doctor, Patient, Appointment
+from utils import role_required, validate_phone, validate_email, normalize_email
+from database import read_replica
+from versions import conditional_view
+from routes.queries import admin_appointment_query, doctor_query
+from routes.pagination import keyset_paginate
+from search import doctor_search_ids, patient_search_ids
+from counters import get_counters
+from instrumentation import endpoint_metrics
+from routes.reference import get_active_doctors, get_departments, invalidate_reference_data, reference_cache
+from routes.slots import slot_cache, slot_index, summary_cache
+from fragments import fragment_cache
+from routes.export import FORMATS, export_chunks, parse_filters
+from routes.bulk import cancel_booked_appointments, deactivate_doctors, deactivate_patients, parse_date_range
 
 def admin_dashboard_view():
-    total_doctors = Doctor.query.count()
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
-    recent_appointments = Appointment.query.order_by(Appointment.created_at.desc()).limit(5).all()
+    counters = get_counters()
+    recent_appointments = admin_appointment_query().order_by(Appointment.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
-                         total_doctors=total_doctors,
-                         total_patients=total_patients,
-                         total_appointments=total_appointments,
+                         total_doctors=counters.total_doctors,
+                         total_patients=counters.total_patients,
+                         total_appointments=counters.total_appointments,
+                         counters=counters,
                          recent_appointments=recent_appointments)
 
 
 def admin_doctors_view():
     search = request.args.get('search', '')
-    from models import Department
+    query = doctor_query()
     if search:
-        doctors = Doctor.query.join(Department).filter(
-            db.or_(
-                Doctor.name.like(f'%{search}%'),
-                Department.name.like(f'%{search}%')
-            )
-        ).all()
-    else:
-        doctors = Doctor.query.all()
+        query = query.filter(Doctor.id.in_(doctor_search_ids(search)))
+    page = keyset_paginate(query, [Doctor.id])
     
-    return render_template('admin/doctors.html', doctors=doctors, search=search)
+    return render_template('admin/doctors.html', doctors=page.items, page=page, search=search)
 
 
 def admin_add_doctor_view():
-    from models import Department
-    from utils import validate_phone, validate_email
-    
     if request.method == 'POST':
         name = request.form.get('name')
-        email = request.form.get('email')
+        email = normalize_email(request.form.get('email'))
         password = request.form.get('password')
         department_id = request.form.get('department_id')
         qualification = request.form.get('qualification')
@@ -46,18 +49,18 @@ def admin_add_doctor_view():
         
         if not validate_email(email):
             flash('Invalid email format', 'danger')
-            departments = Department.query.all()
+            departments = get_departments()
             return render_template('admin/add_doctor.html', departments=departments)
         
         if not validate_phone(contact):
             flash('Phone number must be exactly 10 digits', 'danger')
-            departments = Department.query.all()
+            departments = get_departments()
             return render_template('admin/add_doctor.html', departments=departments)
         
         existing_user = User.query.filter_by(email=email).first()
         if existing_user:
             flash('Email already registered', 'danger')
-            departments = Department.query.all()
+            departments = get_departments()
             return render_template('admin/add_doctor.html', departments=departments)
         
         user = User(email=email, role='doctor')
@@ -75,18 +78,16 @@ def admin_add_doctor_view():
         )
         db.session.add(doctor)
         db.session.commit()
+        invalidate_reference_data()
         
         flash('Doctor added successfully', 'success')
-        return redirect(url_for('admin_doctors'))
+        return redirect(url_for('admin.doctors'))
     
-    departments = Department.query.all()
+    departments = get_departments()
     return render_template('admin/add_doctor.html', departments=departments)
 
 
 def admin_edit_doctor_view(doctor_id):
-    from models import Department
-    from utils import validate_phone
-    
     doctor = Doctor.query.get_or_404(doctor_id)
     
     if request.method == 'POST':
@@ -94,7 +95,7 @@ def admin_edit_doctor_view(doctor_id):
         
         if not validate_phone(contact):
             flash('Phone number must be exactly 10 digits', 'danger')
-            departments = Department.query.all()
+            departments = get_departments()
             return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
         
         doctor.name = request.form.get('name')
@@ -104,62 +105,116 @@ def admin_edit_doctor_view(doctor_id):
         doctor.experience_years = request.form.get('experience')
         
         db.session.commit()
+        invalidate_reference_data()
         flash('Doctor updated successfully', 'success')
-        return redirect(url_for('admin_doctors'))
+        return redirect(url_for('admin.doctors'))
     
-    from models import Department
-    departments = Department.query.all()
+    departments = get_departments()
     return render_template('admin/edit_doctor.html', doctor=doctor, departments=departments)
 
 
 def admin_delete_doctor_view(doctor_id):
-    doctor = Doctor.query.get_or_404(doctor_id)
-    user = User.query.get(doctor.user_id)
-    user.is_active = False
-    db.session.commit()
+    if not deactivate_doctors([doctor_id]):
+        Doctor.query.get_or_404(doctor_id)
     flash('Doctor removed successfully', 'success')
-    return redirect(url_for('admin_doctors'))
+    return redirect(url_for('admin.doctors'))
 
 
 def admin_patients_view():
     search = request.args.get('search', '')
+    query = Patient.query
     if search:
-        patients = Patient.query.filter(
+        query = query.filter(
             db.or_(
-                Patient.name.like(f'%{search}%'),
-                Patient.contact.like(f'%{search}%'),
+                Patient.id.in_(patient_search_ids(search)),
                 Patient.id == int(search) if search.isdigit() else False
             )
-        ).all()
-    else:
-        patients = Patient.query.all()
+        )
+    page = keyset_paginate(query, [Patient.id])
     
-    return render_template('admin/patients.html', patients=patients, search=search)
+    return render_template('admin/patients.html', patients=page.items, page=page, search=search)
 
 
 def admin_delete_patient_view(patient_id):
-    patient = Patient.query.get_or_404(patient_id)
-    user = User.query.get(patient.user_id)
-    user.is_active = False
-    db.session.commit()
+    if not deactivate_patients([patient_id]):
+        Patient.query.get_or_404(patient_id)
     flash('Patient removed successfully', 'success')
-    return redirect(url_for('admin_patients'))
+    return redirect(url_for('admin.patients'))
+
+
+def admin_deactivate_doctors_view():
+    doctor_ids = request.form.getlist('doctor_id', type=int)
+    if not doctor_ids:
+        flash('Select at least one doctor', 'warning')
+    else:
+        flash(f'{deactivate_doctors(doctor_ids)} doctor(s) removed', 'success')
+    return redirect(url_for('admin.doctors'))
+
+
+def admin_deactivate_patients_view():
+    patient_ids = request.form.getlist('patient_id', type=int)
+    if not patient_ids:
+        flash('Select at least one patient', 'warning')
+    else:
+        flash(f'{deactivate_patients(patient_ids)} patient(s) removed', 'success')
+    return redirect(url_for('admin.patients'))
 
 
 def admin_appointments_view():
-    appointments = Appointment.query.order_by(Appointment.appointment_date.desc()).all()
-    return render_template('admin/appointments.html', appointments=appointments)
+    page = keyset_paginate(admin_appointment_query(),
+                           [Appointment.appointment_date, Appointment.id],
+                           descending=True)
+    return render_template('admin/appointments.html', appointments=page.items, page=page,
+                           departments=get_departments(), doctors=get_active_doctors())
+
+
+def admin_cancel_appointments_view():
+    doctor_id = request.form.get('doctor_id', type=int)
+    try:
+        start_date, end_date = parse_date_range(request.form)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.appointments'))
+    if not doctor_id:
+        flash('Select a doctor', 'danger')
+        return redirect(url_for('admin.appointments'))
+
+    count = cancel_booked_appointments(doctor_id, start_date, end_date)
+    flash(f'{count} booked appointment(s) cancelled', 'success')
+    return redirect(url_for('admin.appointments'))
+
+
+# Streams every matching appointment, with its treatment, as CSV or NDJSON.
+# The body is generated while it is sent, so memory does not grow with the
+# number of rows.
+def admin_export_appointments_view():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in FORMATS:
+        flash('Unknown export format', 'danger')
+        return redirect(url_for('admin.appointments'))
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.appointments'))
+
+    mimetype, extension = FORMATS[export_format]
+    compress = request.args.get('gzip') == '1'
+    filename = f'appointments-{date.today().isoformat()}.{extension}'
+    if compress:
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    response = Response(stream_with_context(export_chunks(export_format, compress, **filters)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 
 def admin_departments_view():
-    from models import Department
-    departments = Department.query.all()
+    departments = get_departments()
     return render_template('admin/departments.html', departments=departments)
 
 
 def admin_add_department_view():
-    from models import Department
-    
     if request.method == 'POST':
         dept_name = request.form.get('name')
         dept_desc = request.form.get('description')
@@ -167,13 +222,115 @@ def admin_add_department_view():
         existing = Department.query.filter_by(name=dept_name).first()
         if existing:
             flash('Department already exists', 'danger')
-            return redirect(url_for('admin_departments'))
+            return redirect(url_for('admin.departments'))
         
         new_dept = Department(name=dept_name, description=dept_desc)
         db.session.add(new_dept)
         db.session.commit()
+        invalidate_reference_data()
         
         flash('Department added successfully', 'success')
-        return redirect(url_for('admin_departments'))
+        return redirect(url_for('admin.departments'))
     
     return render_template('admin/add_department.html')
+
+
+def admin_cache_stats_view():
+    return {'reference_cache': reference_cache.stats(), 'slot_cache': slot_cache.stats(),
+            'summary_cache': summary_cache.stats(), 'fragment_cache': fragment_cache.stats(),
+            'slot_index': slot_index.stats()}
+
+
+def admin_metrics_view():
+    return {'endpoints': endpoint_metrics.snapshot(), **admin_cache_stats_view()}
+
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin_bp.route('/dashboard')
+@role_required('admin')
+@read_replica
+def dashboard():
+    return admin_dashboard_view()
+
+@admin_bp.route('/doctors')
+@role_required('admin')
+@read_replica
+def doctors():
+    return admin_doctors_view()
+
+@admin_bp.route('/add_doctor', methods=['GET', 'POST'])
+@role_required('admin')
+def add_doctor():
+    return admin_add_doctor_view()
+
+@admin_bp.route('/edit_doctor/<int:doctor_id>', methods=['GET', 'POST'])
+@role_required('admin')
+def edit_doctor(doctor_id):
+    return admin_edit_doctor_view(doctor_id)
+
+@admin_bp.route('/delete_doctor/<int:doctor_id>')
+@role_required('admin')
+def delete_doctor(doctor_id):
+    return admin_delete_doctor_view(doctor_id)
+
+@admin_bp.route('/doctors/remove', methods=['POST'])
+@role_required('admin')
+def remove_doctors():
+    return admin_deactivate_doctors_view()
+
+@admin_bp.route('/patients')
+@role_required('admin')
+@read_replica
+def patients():
+    return admin_patients_view()
+
+@admin_bp.route('/delete_patient/<int:patient_id>')
+@role_required('admin')
+def delete_patient(patient_id):
+    return admin_delete_patient_view(patient_id)
+
+@admin_bp.route('/patients/remove', methods=['POST'])
+@role_required('admin')
+def remove_patients():
+    return admin_deactivate_patients_view()
+
+@admin_bp.route('/appointments')
+@role_required('admin')
+@read_replica
+@conditional_view(lambda: ['appointments', 'patients', 'doctors', 'departments'])
+def appointments():
+    return admin_appointments_view()
+
+@admin_bp.route('/appointments/cancel', methods=['POST'])
+@role_required('admin')
+def cancel_appointments():
+    return admin_cancel_appointments_view()
+
+@admin_bp.route('/appointments/export')
+@role_required('admin')
+@read_replica
+def export_appointments():
+    return admin_export_appointments_view()
+
+@admin_bp.route('/departments')
+@role_required('admin')
+@read_replica
+def departments():
+    return admin_departments_view()
+
+@admin_bp.route('/add_department', methods=['GET', 'POST'])
+@role_required('admin')
+def add_department():
+    return admin_add_department_view()
+
+@admin_bp.route('/cache_stats')
+@role_required('admin')
+def cache_stats():
+    return admin_cache_stats_view()
+
+@admin_bp.route('/metrics')
+@role_required('admin')
+def metrics():
+    return admin_metrics_view()
@@ -0,0 +1,110 @@
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from models import db, User, Admin, Doctor, Patient
+from utils import validate_phone, validate_email, normalize_email
+
+auth_bp = Blueprint('auth', __name__)
+
+
+@auth_bp.route('/')
+def index():
+    if 'user_id' in session:
+        role = session.get('role')
+        if role == 'admin':
+            return redirect(url_for('admin.dashboard'))
+        elif role == 'doctor':
+            return redirect(url_for('doctor.dashboard'))
+        elif role == 'patient':
+            return redirect(url_for('patient.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = normalize_email(request.form.get('email'))
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(email=email).first()
+        
+        if user and user.check_password(password) and user.is_active:
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+            
+            session['user_id'] = user.id
+            session['role'] = user.role
+            session['email'] = user.email
+            
+            if user.role == 'admin':
+                admin = Admin.query.filter_by(user_id=user.id).first()
+                session['name'] = admin.name
+                return redirect(url_for('admin.dashboard'))
+            elif user.role == 'doctor':
+                doctor = Doctor.query.filter_by(user_id=user.id).first()
+                session['name'] = doctor.name
+                session['doctor_id'] = doctor.id
+                return redirect(url_for('doctor.dashboard'))
+            elif user.role == 'patient':
+                patient = Patient.query.filter_by(user_id=user.id).first()
+                session['name'] = patient.name
+                session['patient_id'] = patient.id
+                return redirect(url_for('patient.dashboard'))
+        else:
+            flash('Invalid credentials or account inactive', 'danger')
+    
+    return render_template('login.html')
+
+
+@auth_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        name = request.form.get('name')
+        email = normalize_email(request.form.get('email'))
+        password = request.form.get('password')
+        age = request.form.get('age')
+        gender = request.form.get('gender')
+        contact = request.form.get('contact')
+        address = request.form.get('address')
+        blood_group = request.form.get('blood_group')
+        
+        if not validate_email(email):
+            flash('Invalid email format', 'danger')
+            return redirect(url_for('auth.register'))
+        
+        if not validate_phone(contact):
+            flash('Phone number must be exactly 10 digits', 'danger')
+            return redirect(url_for('auth.register'))
+        
+        existing_user = User.query.filter_by(email=email).first()
+        if existing_user:
+            flash('Email already registered', 'danger')
+            return redirect(url_for('auth.register'))
+        
+        user = User(email=email, role='patient')
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        
+        patient = Patient(
+            user_id=user.id,
+            name=name,
+            age=age,
+            gender=gender,
+            contact=contact,
+            address=address,
+            blood_group=blood_group
+        )
+        db.session.add(patient)
+        db.session.commit()
+        
+        flash('Registration successful! Please login', 'success')
+        return redirect(url_for('auth.login'))
+    
+    return render_template('register.html')
+
+
+@auth_bp.route('/logout')
+def logout():
+    session.clear()
+    flash('Logged out successfully', 'info')
+    return redirect(url_for('auth.login'))
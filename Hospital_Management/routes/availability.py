@@ -0,0 +1,164 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from models import db, Appointment, DoctorAvailability, Patient, ScheduleRule, ScheduleException
+from routes.schedule import expand_availability
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# How far ahead bookings are checked against a changed schedule.
+CONFLICT_HORIZON_DAYS = 60
+
+AvailabilityChanges = namedtuple('AvailabilityChanges', 'inserted updated deleted unchanged conflicts')
+Conflict = namedtuple('Conflict', 'appointment_id date time patient_name')
+
+
+def _parse(value, fmt, message):
+    try:
+        return datetime.strptime(value or '', fmt)
+    except ValueError:
+        raise ValueError(message) from None
+
+
+def _parse_hours(form, start_field, end_field, label):
+    message = f'Invalid time on {label}'
+    start_time = _parse(form.get(start_field), '%H:%M', message).time()
+    end_time = _parse(form.get(end_field), '%H:%M', message).time()
+    if start_time >= end_time:
+        raise ValueError(f'Start time must be before end time on {label}')
+    return start_time, end_time
+
+
+# Reads the weekly form into {weekday: (start_time, end_time) or None}, None
+# meaning the day was left unticked. Raises ValueError with a message for
+# the user on a bad time, so a malformed submit changes nothing.
+def parse_weekly(form):
+    weekly = {}
+    for weekday, name in enumerate(WEEKDAYS):
+        if form.get(f'available_{weekday}'):
+            weekly[weekday] = _parse_hours(form, f'start_time_{weekday}', f'end_time_{weekday}', name)
+        else:
+            weekly[weekday] = None
+    return weekly
+
+
+# Reads the exception form into the fields of a ScheduleException. Without
+# hours it is leave (a day off).
+def parse_exception(form):
+    start_date = _parse(form.get('start_date'), '%Y-%m-%d', 'Invalid start date').date()
+    end_date = _parse(form.get('end_date') or form.get('start_date'), '%Y-%m-%d', 'Invalid end date').date()
+    if end_date < start_date:
+        raise ValueError('End date must not be before start date')
+    if start_date < date.today():
+        raise ValueError('Exceptions cannot start in the past')
+    start_time = end_time = None
+    if form.get('kind') == 'hours':
+        start_time, end_time = _parse_hours(form, 'start_time', 'end_time', start_date.strftime('%d %b'))
+    return {'start_date': start_date, 'end_date': end_date, 'start_time': start_time,
+            'end_time': end_time, 'reason': (form.get('reason') or '').strip()[:200] or None}
+
+
+# Booked appointments from today to the horizon that fall outside the
+# doctor's expanded schedule, as it stands in the current transaction.
+def find_conflicts(doctor_id, horizon_days=CONFLICT_HORIZON_DAYS):
+    first_day = date.today()
+    last_day = first_day + timedelta(days=horizon_days)
+    booked = db.session.query(
+        Appointment.id, Appointment.appointment_date, Appointment.appointment_time, Patient.name
+    ).join(Patient, Patient.id == Appointment.patient_id).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_date.between(first_day, last_day),
+        Appointment.status == 'Booked'
+    ).order_by(Appointment.appointment_date, Appointment.appointment_time).all()
+    if not booked:
+        return []
+
+    windows = {}
+    for window in expand_availability(first_day, last_day, [doctor_id]):
+        windows.setdefault(window.date, []).append(window)
+    return [
+        Conflict(*row) for row in booked
+        if not any(w.start_time <= row.appointment_time <= w.end_time for w in windows.get(row.appointment_date, []))
+    ]
+
+
+def weekly_rules(doctor_id):
+    rules = {}
+    for rule in ScheduleRule.query.filter(
+        ScheduleRule.doctor_id == doctor_id,
+        ScheduleRule.valid_from == None,
+        ScheduleRule.valid_until == None
+    ).order_by(ScheduleRule.id):
+        rules.setdefault(rule.weekday, []).append(rule)
+    return rules
+
+
+# Applies the submitted week to the doctor's open-ended weekly rules as a
+# diff: unchanged weekdays are not touched, changed ones are updated in
+# place, unticked ones deleted and new ones inserted, in one transaction.
+# Rules limited to a date range are left alone.
+def save_weekly_rules(doctor_id, weekly):
+    existing = weekly_rules(doctor_id)
+    inserted = updated = deleted = unchanged = 0
+    for weekday, hours in weekly.items():
+        rules = existing.get(weekday, [])
+        if hours is None:
+            for rule in rules:
+                db.session.delete(rule)
+                deleted += 1
+            continue
+
+        start_time, end_time = hours
+        if not rules:
+            db.session.add(ScheduleRule(doctor_id=doctor_id, weekday=weekday,
+                                        start_time=start_time, end_time=end_time))
+            inserted += 1
+            continue
+
+        rule, extra = rules[0], rules[1:]
+        for duplicate in extra:
+            db.session.delete(duplicate)
+            deleted += 1
+        if (rule.start_time, rule.end_time) == hours and not extra:
+            unchanged += 1
+            continue
+        rule.start_time, rule.end_time = start_time, end_time
+        updated += 1
+
+    conflicts = []
+    if inserted or updated or deleted:
+        db.session.flush()
+        conflicts = find_conflicts(doctor_id)
+    db.session.commit()
+    return AvailabilityChanges(inserted, updated, deleted, unchanged, conflicts)
+
+
+def add_exception(doctor_id, fields):
+    db.session.add(ScheduleException(doctor_id=doctor_id, **fields))
+    db.session.flush()
+    conflicts = find_conflicts(doctor_id)
+    db.session.commit()
+    return conflicts
+
+
+# Removes one of the doctor's exceptions or dated availability rows.
+# Returns False if it does not exist or belongs to someone else.
+def remove_entry(doctor_id, model, entry_id):
+    entry = db.session.get(model, entry_id)
+    if entry is None or entry.doctor_id != doctor_id:
+        return False
+    db.session.delete(entry)
+    db.session.commit()
+    return True
+
+
+def upcoming_entries(doctor_id):
+    today = date.today()
+    exceptions = ScheduleException.query.filter(
+        ScheduleException.doctor_id == doctor_id,
+        ScheduleException.end_date >= today
+    ).order_by(ScheduleException.start_date).all()
+    dated = DoctorAvailability.query.filter(
+        DoctorAvailability.doctor_id == doctor_id,
+        DoctorAvailability.date >= today
+    ).order_by(DoctorAvailability.date).all()
+    return exceptions, dated
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, Appointment
+from routes.schedule import windows_on
+from routes.slots import SEARCH_WINDOW_DAYS, get_free_slots, slot_bit, slot_minutes, window_slots
+
+BOOKED = 'booked'
+SLOT_TAKEN = 'slot_taken'
+PATIENT_BUSY = 'patient_busy'
+NOT_AVAILABLE = 'not_available'
+OUTSIDE_HOURS = 'outside_hours'
+
+
+# Books a slot with one availability read (the doctor's expanded schedule
+# for that day), the day's free bitmap (usually cached by the booking page)
+# and one INSERT. Double booking is
+# prevented by the partial unique indexes on appointments rather than by
+# checking first, so two requests racing for the same slot cannot both win:
+# the loser gets an IntegrityError and is reported as SLOT_TAKEN (or
+# PATIENT_BUSY if it was the patient's own slot that clashed).
+# Weekly rules give windows on every date, so slots that have already
+# started and dates past the slot search window are refused up front.
+# Only times on the slot grid whose slot ends inside a window are accepted,
+# so the unique index on the start time covers every overlap between new
+# bookings; the free bitmap also refuses slots overlapping older off-grid
+# appointments, which the index cannot see.
+def book_slot(patient_id, doctor_id, appointment_date, appointment_time):
+    now = datetime.now()
+    if (appointment_date < now.date()
+            or appointment_date == now.date() and appointment_time <= now.time()
+            or appointment_date > now.date() + timedelta(days=SEARCH_WINDOW_DAYS - 1)):
+        return NOT_AVAILABLE, None
+
+    windows = windows_on(doctor_id, appointment_date)
+
+    if not windows:
+        return NOT_AVAILABLE, None
+
+    length = slot_minutes()
+    slot = slot_bit(appointment_time, length)
+    if not slot & window_slots(windows, length):
+        return OUTSIDE_HOURS, windows[0]
+
+    if not slot & get_free_slots(doctor_id, appointment_date, 1)[0].free:
+        return SLOT_TAKEN, None
+
+    appointment = Appointment(
+        patient_id=patient_id,
+        doctor_id=doctor_id,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time
+    )
+    db.session.add(appointment)
+    try:
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        if 'patient_id' in str(error.orig):
+            return PATIENT_BUSY, None
+        return SLOT_TAKEN, None
+
+    return BOOKED, appointment
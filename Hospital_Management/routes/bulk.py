@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import select
+from models import db, Appointment, Doctor, Patient, User
+from counters import bump_counters
+from versions import bump_versions, doctor_scope
+from routes.reference import invalidate_reference_data
+
+appointments = Appointment.__table__
+users = User.__table__
+
+# Set-based admin actions: each is one UPDATE in the request's transaction
+# and returns the number of rows it changed. Core statements skip the ORM
+# events, so the counters, change versions, row versions and cached slots
+# those events keep are updated here instead.
+
+
+def parse_date_range(form):
+    try:
+        start_date = datetime.strptime(form.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(form.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('Enter a start and an end date') from None
+    if end_date < start_date:
+        raise ValueError('End date must not be before start date')
+    return start_date, end_date
+
+
+# Cancels the doctor's Booked appointments dated between the two days
+# (inclusive). The roster is unchanged: it only counts completed visits and
+# the first booking, which cancelling does not move.
+def cancel_booked_appointments(doctor_id, start_date, end_date):
+    connection = db.session.connection()
+    days = connection.execute(
+        appointments.update().where(
+            appointments.c.doctor_id == doctor_id,
+            appointments.c.status == 'Booked',
+            appointments.c.appointment_date.between(start_date, end_date)
+        ).values(status='Cancelled', version_id=appointments.c.version_id + 1)
+        .returning(appointments.c.appointment_date)
+    ).scalars().all()
+    if days:
+        bump_counters(connection, booked_appointments=-len(days), cancelled_appointments=len(days))
+        bump_versions(connection, 'appointments', doctor_scope(doctor_id))
+        # Discarded from the slot cache once the commit succeeds (see slots.py).
+        db.session.info.setdefault('changed_slots', set()).update((doctor_id, day) for day in set(days))
+    db.session.commit()
+    return len(days)
+
+
+def _deactivate(owners, ids, scope):
+    connection = db.session.connection()
+    count = connection.execute(
+        users.update().where(
+            users.c.id.in_(select(owners.c.user_id).where(owners.c.id.in_(ids))),
+            users.c.is_active.isnot(False)
+        ).values(is_active=False)
+    ).rowcount
+    if count:
+        bump_counters(connection, active_users=-count, inactive_users=count)
+        bump_versions(connection, scope)
+    db.session.commit()
+    return count
+
+
+# Deactivates the accounts of the given doctors and returns how many were
+# still active. Inactive doctors drop out of the booking directory.
+def deactivate_doctors(doctor_ids):
+    count = _deactivate(Doctor.__table__, doctor_ids, 'doctors')
+    if count:
+        invalidate_reference_data()
+    return count
+
+
+def deactivate_patients(patient_ids):
+    return _deactivate(Patient.__table__, patient_ids, 'patients')
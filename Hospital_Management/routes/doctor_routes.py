@@ -1,36 +1,41 @@
-from flask import render_template, request, redirect, url_for, session, flash
-from models import db, Doctor, Patient, Appointment, Treatment, DoctorAvailability
-from datetime import datetime, timedelta, date
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from models import db, Doctor, Patient, Appointment, Treatment, DoctorAvailability, ScheduleException
+from datetime import timedelta, date
 from utils import role_required
+from routes.queries import doctor_appointment_query, history_appointments
+from routes.pagination import keyset_paginate
+from routes.availability import (WEEKDAYS, parse_weekly, parse_exception, save_weekly_rules, add_exception,
+                                 remove_entry, upcoming_entries, weekly_rules)
+from routes.schedule import expand_availability
+from roster import doctor_roster
+from database import read_replica
+from versions import conditional_view, doctor_scope
+from routes.bulk import cancel_booked_appointments, parse_date_range
 
 def doctor_dashboard_view():
     doctor_id = session.get('doctor_id')
     today = date.today()
     week_later = today + timedelta(days=7)
     
-    upcoming_appointments = Appointment.query.filter(
+    upcoming_appointments = doctor_appointment_query().filter(
         Appointment.doctor_id == doctor_id,
         Appointment.appointment_date >= today,
         Appointment.appointment_date <= week_later,
         Appointment.status == 'Booked'
     ).order_by(Appointment.appointment_date).all()
     
-    patients = db.session.query(Patient).join(Appointment).filter(
-        Appointment.doctor_id == doctor_id
-    ).distinct().all()
-    
     return render_template('doctor/dashboard.html',
                          upcoming_appointments=upcoming_appointments,
-                         patients=patients)
+                         roster=doctor_roster(doctor_id))
 
 
 def doctor_appointments_view():
     doctor_id = session.get('doctor_id')
-    appointments = Appointment.query.filter_by(doctor_id=doctor_id).order_by(
-        Appointment.appointment_date.desc()
-    ).all()
+    page = keyset_paginate(doctor_appointment_query().filter_by(doctor_id=doctor_id),
+                           [Appointment.appointment_date, Appointment.id],
+                           descending=True)
     
-    return render_template('doctor/appointments.html', appointments=appointments)
+    return render_template('doctor/appointments.html', appointments=page.items, page=page)
 
 
 def doctor_complete_appointment_view(appointment_id):
@@ -53,7 +58,7 @@ def doctor_complete_appointment_view(appointment_id):
         db.session.commit()
         
         flash('Appointment completed successfully', 'success')
-        return redirect(url_for('doctor_appointments'))
+        return redirect(url_for('doctor.appointments'))
     
     return render_template('doctor/complete_appointment.html', appointment=appointment)
 
@@ -63,54 +68,122 @@ def doctor_cancel_appointment_view(appointment_id):
     appointment.status = 'Cancelled'
     db.session.commit()
     flash('Appointment cancelled', 'info')
-    return redirect(url_for('doctor_appointments'))
+    return redirect(url_for('doctor.appointments'))
+
+
+# Cancels every booking in a date range at once, e.g. for leave.
+def doctor_cancel_appointments_view():
+    try:
+        start_date, end_date = parse_date_range(request.form)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('doctor.appointments'))
+
+    count = cancel_booked_appointments(session.get('doctor_id'), start_date, end_date)
+    flash(f'{count} booked appointment(s) cancelled', 'info')
+    return redirect(url_for('doctor.appointments'))
 
 
 def doctor_patient_history_view(patient_id):
     patient = Patient.query.get_or_404(patient_id)
-    appointments = Appointment.query.filter_by(patient_id=patient_id).order_by(
-        Appointment.appointment_date.desc()
-    ).all()
+    appointments = history_appointments('doctor', patient_id)
     
     return render_template('doctor/patient_history.html', patient=patient, appointments=appointments)
 
 
+def _flash_conflicts(conflicts):
+    if conflicts:
+        listed = ', '.join(f"{c.date.strftime('%d %b')} {c.time.strftime('%H:%M')} ({c.patient_name})"
+                           for c in conflicts[:10])
+        more = f' and {len(conflicts) - 10} more' if len(conflicts) > 10 else ''
+        flash(f'{len(conflicts)} booked appointment(s) now fall outside your hours: {listed}{more}', 'warning')
+
+
 def doctor_availability_view():
     doctor_id = session.get('doctor_id')
     
     if request.method == 'POST':
-        DoctorAvailability.query.filter_by(doctor_id=doctor_id).delete()
-        
-        for i in range(7):
-            available = request.form.get(f'available_{i}')
-            if available:
-                date_str = request.form.get(f'date_{i}')
-                start_time_str = request.form.get(f'start_time_{i}')
-                end_time_str = request.form.get(f'end_time_{i}')
-                
-                availability = DoctorAvailability(
-                    doctor_id=doctor_id,
-                    date=datetime.strptime(date_str, '%Y-%m-%d').date(),
-                    start_time=datetime.strptime(start_time_str, '%H:%M').time(),
-                    end_time=datetime.strptime(end_time_str, '%H:%M').time()
-                )
-                db.session.add(availability)
-        
-        db.session.commit()
-        flash('Availability updated successfully', 'success')
-        return redirect(url_for('doctor_dashboard'))
+        action = request.form.get('action', 'weekly')
+        try:
+            if action == 'weekly':
+                changes = save_weekly_rules(doctor_id, parse_weekly(request.form))
+                if changes.inserted or changes.updated or changes.deleted:
+                    flash('Weekly schedule updated successfully', 'success')
+                else:
+                    flash('No changes to weekly schedule', 'info')
+                _flash_conflicts(changes.conflicts)
+            elif action == 'add_exception':
+                conflicts = add_exception(doctor_id, parse_exception(request.form))
+                flash('Exception added', 'success')
+                _flash_conflicts(conflicts)
+            elif action in ('remove_exception', 'remove_dated'):
+                model = ScheduleException if action == 'remove_exception' else DoctorAvailability
+                if remove_entry(doctor_id, model, request.form.get('entry_id', type=int)):
+                    flash('Entry removed', 'info')
+                else:
+                    flash('Entry not found', 'danger')
+        except ValueError as error:
+            flash(str(error), 'danger')
+        return redirect(url_for('doctor.availability'))
     
-    next_7_days = [(date.today() + timedelta(days=i)) for i in range(7)]
-    current_availability = DoctorAvailability.query.filter_by(doctor_id=doctor_id).all()
-    
-    availability_dict = {}
-    for avail in current_availability:
-        availability_dict[avail.date] = {
-            'start_time': avail.start_time.strftime('%H:%M'),
-            'end_time': avail.end_time.strftime('%H:%M'),
-            'is_available': True
-        }
+    rules = weekly_rules(doctor_id)
+    weekly = [
+        {'name': name, 'available': weekday in rules,
+         'start_time': rules[weekday][0].start_time.strftime('%H:%M') if weekday in rules else '09:00',
+         'end_time': rules[weekday][0].end_time.strftime('%H:%M') if weekday in rules else '17:00'}
+        for weekday, name in enumerate(WEEKDAYS)
+    ]
+    exceptions, dated = upcoming_entries(doctor_id)
+    today = date.today()
+    upcoming = list(expand_availability(today, today + timedelta(days=13), [doctor_id]))
     
     return render_template('doctor/availability.html',
-                         next_7_days=next_7_days,
-                         availability_dict=availability_dict)
+                         weekly=weekly,
+                         exceptions=exceptions,
+                         dated=dated,
+                         upcoming=upcoming,
+                         today=today)
+
+
+doctor_bp = Blueprint('doctor', __name__, url_prefix='/doctor')
+
+
+@doctor_bp.route('/dashboard')
+@role_required('doctor')
+@read_replica
+@conditional_view(lambda: [doctor_scope(session.get('doctor_id')), 'patients'])
+def dashboard():
+    return doctor_dashboard_view()
+
+@doctor_bp.route('/appointments')
+@role_required('doctor')
+@read_replica
+@conditional_view(lambda: [doctor_scope(session.get('doctor_id')), 'patients'])
+def appointments():
+    return doctor_appointments_view()
+
+@doctor_bp.route('/complete_appointment/<int:appointment_id>', methods=['GET', 'POST'])
+@role_required('doctor')
+def complete_appointment(appointment_id):
+    return doctor_complete_appointment_view(appointment_id)
+
+@doctor_bp.route('/cancel_appointment/<int:appointment_id>')
+@role_required('doctor')
+def cancel_appointment(appointment_id):
+    return doctor_cancel_appointment_view(appointment_id)
+
+@doctor_bp.route('/cancel_appointments', methods=['POST'])
+@role_required('doctor')
+def cancel_appointments():
+    return doctor_cancel_appointments_view()
+
+@doctor_bp.route('/patient_history/<int:patient_id>')
+@role_required('doctor')
+@read_replica
+def patient_history(patient_id):
+    return doctor_patient_history_view(patient_id)
+
+@doctor_bp.route('/availability', methods=['GET', 'POST'])
+@role_required('doctor')
+def availability():
+    return doctor_availability_view()
@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from models import db, Appointment, ArchivedAppointment, ArchivedTreatment, Department, Doctor, Patient, Treatment
+
+# Rows are fetched from the cursor this many at a time; only one batch of
+# rows and one chunk of output are held in memory while an export streams.
+EXPORT_BATCH_ROWS = 1000
+CHUNK_BYTES = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+FIELD_NAMES = ['appointment_id', 'appointment_date', 'appointment_time', 'status', 'patient_id', 'patient_name',
+               'doctor_id', 'doctor_name', 'department', 'diagnosis', 'prescription', 'notes', 'treated_at']
+
+# Archived appointments are exported first, then the live ones; each part
+# is in date order.
+SOURCES = [(ArchivedAppointment, ArchivedTreatment), (Appointment, Treatment)]
+
+
+def parse_filters(args):
+    filters = {}
+    for name in ('start_date', 'end_date'):
+        if args.get(name):
+            try:
+                filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'Invalid {name.replace("_", " ")}') from None
+    if 'start_date' in filters and 'end_date' in filters and filters['end_date'] < filters['start_date']:
+        raise ValueError('End date must not be before start date')
+    department_id = args.get('department_id', type=int)
+    if department_id:
+        filters['department_id'] = department_id
+    return filters
+
+
+def export_statement(appointment, treatment, start_date=None, end_date=None, department_id=None):
+    statement = select(
+        appointment.id, appointment.appointment_date, appointment.appointment_time, appointment.status,
+        Patient.id, Patient.name, Doctor.id, Doctor.name, Department.name,
+        treatment.diagnosis, treatment.prescription, treatment.notes, treatment.created_at
+    ).select_from(appointment).join(
+        Patient, Patient.id == appointment.patient_id
+    ).join(
+        Doctor, Doctor.id == appointment.doctor_id
+    ).join(
+        Department, Department.id == Doctor.department_id
+    ).outerjoin(
+        treatment, treatment.appointment_id == appointment.id
+    ).order_by(appointment.appointment_date, appointment.id)
+    if start_date:
+        statement = statement.where(appointment.appointment_date >= start_date)
+    if end_date:
+        statement = statement.where(appointment.appointment_date <= end_date)
+    if department_id:
+        statement = statement.where(Doctor.department_id == department_id)
+    return statement
+
+
+# Yields the export rows as plain tuples. yield_per keeps the cursor open
+# and fetches in batches instead of buffering the whole result.
+def export_rows(**filters):
+    for appointment, treatment in SOURCES:
+        statement = export_statement(appointment, treatment, **filters)
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        try:
+            for row in result:
+                yield tuple(row)
+        finally:
+            result.close()
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _json(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return value.isoformat()
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELD_NAMES)
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows):
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(FIELD_NAMES, map(_json, row))), ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(lines).encode()
+            lines, size = [], 0
+    yield ''.join(lines).encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(export_format, compress, **filters):
+    encode = csv_chunks if export_format == 'csv' else ndjson_chunks
+    chunks = encode(export_rows(**filters))
+    return gzip_chunks(chunks) if compress else chunks
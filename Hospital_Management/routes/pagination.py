@@ -0,0 +1,88 @@
+from datetime import date
+from flask import request
+from models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class KeysetPage:
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def page_size():
+    per_page = request.args.get('per_page', type=int) or DEFAULT_PAGE_SIZE
+    return max(1, min(per_page, MAX_PAGE_SIZE))
+
+
+def encode_cursor(row, keys):
+    values = []
+    for key in keys:
+        value = getattr(row, key.key)
+        values.append(value.isoformat() if isinstance(value, date) else str(value))
+    return '_'.join(values)
+
+
+def decode_cursor(cursor, keys):
+    if not cursor:
+        return None
+    parts = cursor.split('_')
+    if len(parts) != len(keys):
+        return None
+    values = []
+    try:
+        for part, key in zip(parts, keys):
+            if key.type.python_type is date:
+                values.append(date.fromisoformat(part))
+            else:
+                values.append(key.type.python_type(part))
+    except ValueError:
+        return None
+    return tuple(values)
+
+
+# Keyset (seek) pagination: every page is a range scan starting at the last
+# row of the previous page, so page 1000 costs the same as page 1. The
+# cursor is taken from ?after= (next page) or ?before= (previous page).
+def keyset_paginate(query, keys, descending=False):
+    per_page = page_size()
+    before = decode_cursor(request.args.get('before'), keys)
+    forward = before is None
+    cursor = decode_cursor(request.args.get('after'), keys) if forward else before
+
+    key = db.tuple_(*keys) if len(keys) > 1 else keys[0]
+    bound = cursor if len(keys) > 1 else (cursor[0] if cursor else None)
+
+    # Walking backwards means scanning in the opposite direction from the
+    # display order and flipping the rows afterwards.
+    scan_down = forward == descending
+    if cursor is not None:
+        query = query.filter(key < bound if scan_down else key > bound)
+    query = query.order_by(*[k.desc() if scan_down else k.asc() for k in keys])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    if forward:
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = encode_cursor(rows[-1], keys) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0], keys) if rows and has_prev else None
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor)
@@ -1,22 +1,22 @@
-from flask import render_template, request, redirect, url_for, session, flash
-from models import db, Doctor, Patient, Department, Appointment, DoctorAvailability, User
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from models import db, Doctor, Patient, Appointment
 from datetime import datetime, timedelta, date
 from utils import role_required, validate_phone
+from routes.queries import patient_appointment_query, history_appointments
+from routes.booking import book_slot, BOOKED, PATIENT_BUSY, SLOT_TAKEN, NOT_AVAILABLE
+from search import ranked_doctor_ids
+from routes.reference import get_departments, get_active_doctors
+from routes.slots import (BOOKING_WINDOW_DAYS, SEARCH_WINDOW_DAYS, bookable_days, availability_summary,
+                          earliest_slots)
+from database import read_replica
 
 def patient_dashboard_view():
-    departments = Department.query.all()
+    departments = get_departments()
     today = date.today()
-    week_later = today + timedelta(days=7)
-    
-    doctors_with_availability = db.session.query(Doctor, DoctorAvailability).join(
-        DoctorAvailability
-    ).filter(
-        DoctorAvailability.date >= today,
-        DoctorAvailability.date <= week_later
-    ).all()
+    summary = availability_summary()
     
     patient_id = session.get('patient_id')
-    upcoming_appointments = Appointment.query.filter(
+    upcoming_appointments = patient_appointment_query().filter(
         Appointment.patient_id == patient_id,
         Appointment.appointment_date >= today,
         Appointment.status == 'Booked'
@@ -24,7 +24,7 @@ def patient_dashboard_view():
     
     return render_template('patient/dashboard.html',
                          departments=departments,
-                         doctors_with_availability=doctors_with_availability,
+                         summary=summary,
                          upcoming_appointments=upcoming_appointments)
 
 
@@ -32,16 +32,13 @@ def patient_doctors_view():
     search = request.args.get('search', '')
     department_id = request.args.get('department_id')
     
-    query = Doctor.query.join(User).filter(User.is_active == True)
-    
-    if department_id:
-        query = query.filter(Doctor.department_id == department_id)
+    doctors = get_active_doctors(department_id)
     
     if search:
-        query = query.filter(Doctor.name.like(f'%{search}%'))
+        by_id = {doctor.id: doctor for doctor in doctors}
+        doctors = [by_id[doctor_id] for doctor_id in ranked_doctor_ids(search) if doctor_id in by_id]
     
-    doctors = query.all()
-    departments = Department.query.all()
+    departments = get_departments()
     
     return render_template('patient/doctors.html',
                          doctors=doctors,
@@ -50,87 +47,92 @@ def patient_doctors_view():
                          selected_department=department_id)
 
 
+# The first free slots in a department across all its doctors, for
+# patients who do not mind whom they see.
+def patient_earliest_slots_view():
+    today = date.today()
+    department_id = request.args.get('department_id', type=int)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    start_date, end_date = today, today + timedelta(days=BOOKING_WINDOW_DAYS - 1)
+    try:
+        if request.args.get('start_date'):
+            start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+        if request.args.get('end_date'):
+            end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+    except ValueError:
+        flash('Invalid date', 'danger')
+        department_id = None
+    start_date = max(start_date, today)
+    end_date = min(end_date, today + timedelta(days=SEARCH_WINDOW_DAYS - 1))
+
+    slots = None
+    if department_id:
+        if end_date < start_date:
+            flash('End date must not be before start date', 'danger')
+        else:
+            slots = earliest_slots(department_id, start_date, end_date, limit)
+
+    return render_template('patient/earliest_slots.html',
+                         departments=get_departments(),
+                         selected_department=department_id,
+                         start_date=start_date,
+                         end_date=end_date,
+                         limit=limit,
+                         slots=slots)
+
+
 def patient_book_appointment_view(doctor_id):
     doctor = Doctor.query.get_or_404(doctor_id)
     
     if request.method == 'POST':
         appointment_date_str = request.form.get('appointment_date')
         appointment_time_str = request.form.get('appointment_time')
-        
-        appointment_date = datetime.strptime(appointment_date_str, '%Y-%m-%d').date()
-        appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time()
+        slot = request.form.get('slot')
+        try:
+            if slot:
+                appointment_date_str, appointment_time_str = slot.split('T')
+            appointment_date = datetime.strptime(appointment_date_str, '%Y-%m-%d').date()
+            appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time()
+        except (ValueError, TypeError):
+            flash('Invalid slot', 'danger')
+            return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
         
         patient_id = session.get('patient_id')
         
-        patient_overlap = Appointment.query.filter_by(
-            patient_id=patient_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        ).filter(Appointment.status != 'Cancelled').first()
-        
-        if patient_overlap:
-            flash('You already have an appointment at this time', 'danger')
-            return redirect(url_for('book_appointment', doctor_id=doctor_id))
+        result, availability = book_slot(patient_id, doctor_id, appointment_date, appointment_time)
         
-        existing = Appointment.query.filter_by(
-            doctor_id=doctor_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        ).filter(Appointment.status != 'Cancelled').first()
+        if result == BOOKED:
+            flash('Appointment booked successfully', 'success')
+            return redirect(url_for('patient.appointments'))
         
-        if existing:
+        if result == PATIENT_BUSY:
+            flash('You already have an appointment at this time', 'danger')
+        elif result == SLOT_TAKEN:
             flash('This time slot is already booked with the doctor', 'danger')
-            return redirect(url_for('book_appointment', doctor_id=doctor_id))
-        
-        availability = DoctorAvailability.query.filter_by(
-            doctor_id=doctor_id,
-            date=appointment_date
-        ).first()
-        
-        if not availability:
+        elif result == NOT_AVAILABLE:
             flash('Doctor is not available on this date', 'danger')
-            return redirect(url_for('book_appointment', doctor_id=doctor_id))
-        
-        if not (availability.start_time <= appointment_time <= availability.end_time):
-            flash(f'Please select a time between {availability.start_time.strftime("%H:%M")} and {availability.end_time.strftime("%H:%M")}', 'danger')
-            return redirect(url_for('book_appointment', doctor_id=doctor_id))
-        
-        appointment = Appointment(
-            patient_id=patient_id,
-            doctor_id=doctor_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        )
-        db.session.add(appointment)
-        db.session.commit()
-        
-        flash('Appointment booked successfully', 'success')
-        return redirect(url_for('patient_appointments'))
+        else:
+            flash(f'Please select one of the listed slots between {availability.start_time.strftime("%H:%M")} and {availability.end_time.strftime("%H:%M")}', 'danger')
+        return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
     
-    today = date.today()
-    week_later = today + timedelta(days=7)
-    available_slots = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.date >= today,
-        DoctorAvailability.date <= week_later
-    ).all()
+    available_days = bookable_days(doctor_id)
     
     return render_template('patient/book_appointment.html',
                          doctor=doctor,
-                         available_slots=available_slots)
+                         available_days=available_days)
 
 
 def patient_appointments_view():
     patient_id = session.get('patient_id')
     today = date.today()
     
-    upcoming = Appointment.query.filter(
+    upcoming = patient_appointment_query().filter(
         Appointment.patient_id == patient_id,
         Appointment.appointment_date >= today,
         Appointment.status == 'Booked'
     ).order_by(Appointment.appointment_date).all()
     
-    past = Appointment.query.filter(
+    past = patient_appointment_query().filter(
         Appointment.patient_id == patient_id,
         db.or_(
             Appointment.appointment_date < today,
@@ -148,20 +150,17 @@ def patient_cancel_appointment_view(appointment_id):
     
     if appointment.patient_id != session.get('patient_id'):
         flash('Unauthorized access', 'danger')
-        return redirect(url_for('patient_appointments'))
+        return redirect(url_for('patient.appointments'))
     
     appointment.status = 'Cancelled'
     db.session.commit()
     flash('Appointment cancelled successfully', 'info')
-    return redirect(url_for('patient_appointments'))
+    return redirect(url_for('patient.appointments'))
 
 
 def patient_treatment_history_view():
     patient_id = session.get('patient_id')
-    appointments = Appointment.query.filter_by(
-        patient_id=patient_id,
-        status='Completed'
-    ).order_by(Appointment.appointment_date.desc()).all()
+    appointments = history_appointments('patient', patient_id, status='Completed')
     
     return render_template('patient/history.html', appointments=appointments)
 
@@ -187,6 +186,55 @@ def patient_profile_view():
         db.session.commit()
         session['name'] = patient.name
         flash('Profile updated successfully', 'success')
-        return redirect(url_for('patient_dashboard'))
+        return redirect(url_for('patient.dashboard'))
     
     return render_template('patient/profile.html', patient=patient)
+
+
+patient_bp = Blueprint('patient', __name__, url_prefix='/patient')
+
+
+@patient_bp.route('/dashboard')
+@role_required('patient')
+@read_replica
+def dashboard():
+    return patient_dashboard_view()
+
+@patient_bp.route('/doctors')
+@role_required('patient')
+@read_replica
+def doctors():
+    return patient_doctors_view()
+
+@patient_bp.route('/first_available')
+@role_required('patient')
+@read_replica
+def first_available():
+    return patient_earliest_slots_view()
+
+@patient_bp.route('/book_appointment/<int:doctor_id>', methods=['GET', 'POST'])
+@role_required('patient')
+def book_appointment(doctor_id):
+    return patient_book_appointment_view(doctor_id)
+
+@patient_bp.route('/appointments')
+@role_required('patient')
+@read_replica
+def appointments():
+    return patient_appointments_view()
+
+@patient_bp.route('/cancel_appointment/<int:appointment_id>')
+@role_required('patient')
+def cancel_appointment(appointment_id):
+    return patient_cancel_appointment_view(appointment_id)
+
+@patient_bp.route('/history')
+@role_required('patient')
+@read_replica
+def history():
+    return patient_treatment_history_view()
+
+@patient_bp.route('/profile', methods=['GET', 'POST'])
+@role_required('patient')
+def profile():
+    return patient_profile_view()
@@ -0,0 +1,64 @@
+from sqlalchemy.orm import joinedload
+from models import Appointment, ArchivedAppointment, Doctor
+
+
+# Each list template walks a fixed set of relationships. Loading them here,
+# in the same statement as the appointments, keeps a page at one SELECT
+# instead of one per row per relationship.
+def _appointment_loaders(relations, model=Appointment):
+    options = []
+    for relation in relations:
+        if relation == 'patient':
+            options.append(joinedload(model.patient))
+        elif relation == 'doctor':
+            options.append(joinedload(model.doctor))
+        elif relation == 'department':
+            options.append(joinedload(model.doctor).joinedload(Doctor.department))
+        elif relation == 'treatment':
+            options.append(joinedload(model.treatment))
+        elif relation == 'treatment_text':
+            options.append(joinedload(model.treatment).undefer_group('text'))
+        else:
+            raise ValueError(f'Unknown appointment relation: {relation}')
+    return options
+
+
+def appointment_query(*relations):
+    return Appointment.query.options(*_appointment_loaders(relations))
+
+
+def admin_appointment_query():
+    return appointment_query('patient', 'department')
+
+
+def doctor_appointment_query():
+    return appointment_query('patient')
+
+
+def patient_appointment_query():
+    return appointment_query('department')
+
+
+HISTORY_RELATIONS = {
+    'doctor': ('treatment_text',),
+    'patient': ('department', 'treatment_text'),
+}
+
+
+# A patient's appointments from the live and the archive table, newest
+# first. Archived rows have the same attributes and relationships as live
+# ones, so the history templates render both alike.
+def history_appointments(role, patient_id, status=None):
+    results = []
+    for model in (Appointment, ArchivedAppointment):
+        query = model.query.options(*_appointment_loaders(HISTORY_RELATIONS[role], model)).filter(
+            model.patient_id == patient_id
+        )
+        if status:
+            query = query.filter(model.status == status)
+        results.extend(query.all())
+    return sorted(results, key=lambda a: (a.appointment_date, a.appointment_time), reverse=True)
+
+
+def doctor_query():
+    return Doctor.query.options(joinedload(Doctor.department))
@@ -0,0 +1,47 @@
+from collections import namedtuple
+from sqlalchemy import func
+from models import db, Department, Doctor, User
+from cache import TTLCache
+
+# Departments and the active-doctor directory change only when an admin
+# edits them, so they are served from memory as plain tuples (safe to share
+# between requests, unlike ORM instances bound to a session).
+DepartmentEntry = namedtuple('DepartmentEntry', 'id name description doctor_count')
+DepartmentRef = namedtuple('DepartmentRef', 'id name')
+DoctorEntry = namedtuple('DoctorEntry', 'id name department_id department qualification contact experience_years')
+
+reference_cache = TTLCache(maxsize=64, ttl=300)
+
+
+def _load_departments():
+    rows = db.session.query(Department, func.count(Doctor.id)).outerjoin(
+        Doctor, Doctor.department_id == Department.id
+    ).group_by(Department.id).order_by(Department.id).all()
+    return [DepartmentEntry(d.id, d.name, d.description, count) for d, count in rows]
+
+
+def get_departments():
+    return reference_cache.get_or_load('departments', _load_departments)
+
+
+def _load_active_doctors(department_id):
+    query = db.session.query(Doctor, Department.name).join(
+        Department, Department.id == Doctor.department_id
+    ).join(User, User.id == Doctor.user_id).filter(User.is_active == True)
+    if department_id:
+        query = query.filter(Doctor.department_id == department_id)
+    return [
+        DoctorEntry(d.id, d.name, d.department_id, DepartmentRef(d.department_id, department_name),
+                    d.qualification, d.contact, d.experience_years)
+        for d, department_name in query.order_by(Doctor.id).all()
+    ]
+
+
+def get_active_doctors(department_id=None):
+    department_id = int(department_id) if str(department_id or '').isdigit() else None
+    return reference_cache.get_or_load(('active_doctors', department_id),
+                                       lambda: _load_active_doctors(department_id))
+
+
+def invalidate_reference_data():
+    reference_cache.invalidate()
@@ -0,0 +1,93 @@
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from sqlalchemy import Integer, and_, literal, null, or_, select, union_all
+from models import db, DoctorAvailability, ScheduleRule, ScheduleException
+
+# One concrete block of availability. Nothing is stored in this shape: it
+# is generated from the weekly rules, the exceptions and any dated
+# DoctorAvailability rows (imported or entered before weekly schedules).
+Window = namedtuple('Window', 'doctor_id date start_time end_time')
+
+RULE = 'rule'
+EXCEPTION = 'exception'
+DATED = 'dated'
+
+
+# Everything that can affect availability between first_day and last_day,
+# fetched in one UNION ALL query over the three indexed tables.
+def _schedule_rows(first_day, last_day, doctor_ids):
+    def for_doctors(column):
+        return column.in_(doctor_ids) if doctor_ids is not None else True
+
+    rules = select(
+        literal(RULE).label('source'), ScheduleRule.doctor_id, ScheduleRule.weekday,
+        ScheduleRule.valid_from.label('first_day'), ScheduleRule.valid_until.label('last_day'),
+        ScheduleRule.start_time, ScheduleRule.end_time
+    ).where(
+        for_doctors(ScheduleRule.doctor_id),
+        or_(ScheduleRule.valid_from == None, ScheduleRule.valid_from <= last_day),
+        or_(ScheduleRule.valid_until == None, ScheduleRule.valid_until >= first_day)
+    )
+    exceptions = select(
+        literal(EXCEPTION), ScheduleException.doctor_id, null().cast(Integer),
+        ScheduleException.start_date, ScheduleException.end_date,
+        ScheduleException.start_time, ScheduleException.end_time
+    ).where(
+        for_doctors(ScheduleException.doctor_id),
+        ScheduleException.start_date <= last_day,
+        ScheduleException.end_date >= first_day
+    )
+    dated = select(
+        literal(DATED), DoctorAvailability.doctor_id, null().cast(Integer),
+        DoctorAvailability.date, DoctorAvailability.date,
+        DoctorAvailability.start_time, DoctorAvailability.end_time
+    ).where(
+        for_doctors(DoctorAvailability.doctor_id),
+        and_(DoctorAvailability.date >= first_day, DoctorAvailability.date <= last_day),
+        DoctorAvailability.is_available != False
+    )
+    return db.session.execute(union_all(rules, exceptions, dated)).all()
+
+
+# Exceptions win over everything (a leave exception anywhere on the day
+# means no availability), then dated rows, then the weekly rule.
+def _day_windows(day, exceptions, dated, rules):
+    covering = [(start_time, end_time) for first, last, start_time, end_time in exceptions
+                if first <= day <= last]
+    if covering:
+        if any(start_time is None for start_time, end_time in covering):
+            return []
+        return covering
+    if day in dated:
+        return dated[day]
+    return [(start_time, end_time) for first, last, start_time, end_time in rules.get(day.weekday(), [])
+            if (first is None or first <= day) and (last is None or day <= last)]
+
+
+# Yields the Windows for every day from first_day to last_day (inclusive),
+# ordered by date and then doctor. doctor_ids=None means every doctor.
+def expand_availability(first_day, last_day, doctor_ids=None):
+    rules = defaultdict(lambda: defaultdict(list))
+    exceptions = defaultdict(list)
+    dated = defaultdict(lambda: defaultdict(list))
+    for source, doctor_id, weekday, first, last, start_time, end_time in _schedule_rows(
+            first_day, last_day, doctor_ids):
+        if source == RULE:
+            rules[doctor_id][weekday].append((first, last, start_time, end_time))
+        elif source == EXCEPTION:
+            exceptions[doctor_id].append((first, last, start_time, end_time))
+        else:
+            dated[doctor_id][first].append((start_time, end_time))
+
+    doctors = sorted(set(rules) | set(dated) | set(exceptions))
+    day = first_day
+    while day <= last_day:
+        for doctor_id in doctors:
+            for start_time, end_time in sorted(_day_windows(day, exceptions[doctor_id], dated[doctor_id],
+                                                            rules[doctor_id])):
+                yield Window(doctor_id, day, start_time, end_time)
+        day += timedelta(days=1)
+
+
+def windows_on(doctor_id, day):
+    return list(expand_availability(day, day, [doctor_id]))
@@ -0,0 +1,390 @@
+import heapq
+import threading
+import time as clock
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import db, Appointment, DoctorAvailability, ScheduleRule, ScheduleException
+from routes.schedule import expand_availability
+from routes.reference import get_active_doctors, get_departments
+from cache import TTLCache
+
+BOOKING_WINDOW_DAYS = 7
+
+# Free slots for one doctor on one day. Bit i of `free` is set when the slot
+# starting i * slot_minutes after midnight lies inside an availability window
+# and does not overlap a non-cancelled appointment.
+DaySlots = namedtuple('DaySlots', 'date slot_minutes free')
+
+# Keyed by (doctor_id, date). Entries are dropped when a booking,
+# cancellation or availability change for that doctor and day commits.
+slot_cache = TTLCache(maxsize=4096, ttl=300)
+
+# Per department and day: doctors with hours, the earliest free slot and
+# how many slots are still free.
+DepartmentDay = namedtuple('DepartmentDay', 'date doctors earliest free_slots')
+AvailabilitySummary = namedtuple('AvailabilitySummary', 'days departments')
+
+# The summary is the same for every patient, so it is shared and only
+# allowed to be a minute old instead of being invalidated.
+summary_cache = TTLCache(maxsize=8, ttl=60)
+
+# Earliest-slot searches may look this many days ahead.
+SEARCH_WINDOW_DAYS = 31
+
+SlotMatch = namedtuple('SlotMatch', 'date time doctor')
+
+
+def slot_minutes():
+    if has_app_context():
+        return current_app.config.get('SLOT_MINUTES', 15)
+    return 15
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _bits(first, last):
+    if last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+# Slots that start and end inside the window.
+def _window_bits(start_time, end_time, length):
+    first = -(-_minute_of_day(start_time) // length)
+    last = (_minute_of_day(end_time) - length) // length
+    return _bits(first, last)
+
+
+# Slots overlapping an appointment that starts at `value`: one slot when the
+# time is on the grid, two when it falls between grid lines.
+def _appointment_bits(value, length):
+    minute = _minute_of_day(value)
+    return _bits(minute // length, (minute + length - 1) // length)
+
+
+# The bit of the slot starting at `value`, or 0 when the time is not on the
+# slot grid.
+def slot_bit(value, length):
+    minute = _minute_of_day(value)
+    if minute % length or value.second or value.microsecond:
+        return 0
+    return 1 << (minute // length)
+
+
+# Slots that start and end inside any of the windows.
+def window_slots(windows, length):
+    slots = 0
+    for window in windows:
+        slots |= _window_bits(window.start_time, window.end_time, length)
+    return slots
+
+
+# Bitmaps keyed by (doctor_id, date) for every day in the range, built with
+# one schedule query (expanded into windows) and one appointment query.
+# doctor_ids=None means every doctor.
+def free_bitmaps(first_day, last_day, length, doctor_ids=None):
+    free = defaultdict(int)
+    for window in expand_availability(first_day, last_day, doctor_ids):
+        free[window.doctor_id, window.date] |= _window_bits(window.start_time, window.end_time, length)
+
+    taken = db.session.query(
+        Appointment.doctor_id, Appointment.appointment_date, Appointment.appointment_time
+    ).filter(
+        Appointment.appointment_date.between(first_day, last_day),
+        Appointment.status != 'Cancelled'
+    )
+    if doctor_ids is not None:
+        taken = taken.filter(Appointment.doctor_id.in_(doctor_ids))
+    for doctor_id, day, appointment_time in taken:
+        if (doctor_id, day) in free:
+            free[doctor_id, day] &= ~_appointment_bits(appointment_time, length)
+
+    return free
+
+
+def compute_free_slots(doctor_id, days, length):
+    free = free_bitmaps(min(days), max(days), length, [doctor_id])
+    return {day: free.get((doctor_id, day), 0) for day in days}
+
+
+# Free slots for the next `days` days starting at `start` (today by
+# default). Cached days are reused; the missing ones are computed together.
+def get_free_slots(doctor_id, start=None, days=BOOKING_WINDOW_DAYS):
+    start = start or date.today()
+    length = slot_minutes()
+    result, tickets = {}, {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        hit, value = slot_cache.lookup((doctor_id, day))
+        if hit and value.slot_minutes != length:
+            slot_cache.discard((doctor_id, day))
+            hit, value = slot_cache.lookup((doctor_id, day))
+        if hit:
+            result[day] = value
+        else:
+            tickets[day] = value
+
+    if tickets:
+        try:
+            for day, free in compute_free_slots(doctor_id, list(tickets), length).items():
+                result[day] = DaySlots(day, length, free)
+                slot_cache.store((doctor_id, day), result[day], tickets[day])
+        finally:
+            for day, ticket in tickets.items():
+                slot_cache.release((doctor_id, day), ticket)
+
+    return [result[day] for day in sorted(result)]
+
+
+# Start times of the free slots in a day, skipping those before not_before.
+def slot_times(day_slots, not_before=None):
+    times = []
+    free, index = day_slots.free, 0
+    while free:
+        if free & 1:
+            minute = index * day_slots.slot_minutes
+            start = time(minute // 60, minute % 60)
+            if not_before is None or start >= not_before:
+                times.append(start)
+        free >>= 1
+        index += 1
+    return times
+
+
+# Bookable slots per day for the booking page: days without any free slot
+# are left out, and today's slots that have already started are hidden.
+def bookable_days(doctor_id, days=BOOKING_WINDOW_DAYS):
+    now = datetime.now()
+    bookable = []
+    for day_slots in get_free_slots(doctor_id, now.date(), days):
+        times = slot_times(day_slots, now.time() if day_slots.date == now.date() else None)
+        if times:
+            bookable.append((day_slots.date, times))
+    return bookable
+
+
+def _load_summary(first_day, days, length, now):
+    last_day = first_day + timedelta(days=days - 1)
+    directory = {doctor.id: doctor for doctor in get_active_doctors()}
+    # Slots that have already started today are not offered any more.
+    started_today = _bits(0, -(-_minute_of_day(now.time()) // length) - 1)
+
+    totals = {}
+    for (doctor_id, day), free in free_bitmaps(first_day, last_day, length).items():
+        doctor = directory.get(doctor_id)
+        if doctor is None:
+            continue
+        if day == now.date():
+            free &= ~started_today
+        doctors, earliest, free_slots = totals.get((doctor.department_id, day), (0, None, 0))
+        if free:
+            first_free = (free & -free).bit_length() - 1
+            start = time(first_free * length // 60, first_free * length % 60)
+            earliest = start if earliest is None else min(earliest, start)
+        totals[doctor.department_id, day] = (doctors + 1, earliest, free_slots + free.bit_count())
+
+    week = [first_day + timedelta(days=offset) for offset in range(days)]
+    departments = []
+    for department in get_departments():
+        cells = [DepartmentDay(day, *totals[department.id, day]) if (department.id, day) in totals else None
+                 for day in week]
+        if any(cells):
+            departments.append((department, cells))
+    return AvailabilitySummary(week, departments)
+
+
+# Per-department availability for the next `days` days, shared by every
+# patient for up to a minute.
+def availability_summary(days=BOOKING_WINDOW_DAYS):
+    now = datetime.now()
+    length = slot_minutes()
+    return summary_cache.get_or_load((now.date(), days, length),
+                                     lambda: _load_summary(now.date(), days, length, now))
+
+
+# Free-slot bitmaps of every doctor, per day, for searches across doctors.
+# A day is loaded whole with one schedule query and one appointment query.
+# After that it is kept current one doctor at a time: a commit touching
+# (doctor, day) only marks that doctor stale, and the next search reloads
+# just the stale doctors of the day. Whole days still expire after `ttl`
+# seconds, so rows written by other processes show up like in slot_cache.
+class SlotIndex:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.loads = 0
+        self.refreshes = 0
+        self._days = {}
+        self._loading = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def free(self, day, length):
+        now = clock.monotonic()
+        with self._lock:
+            entry = self._days.get(day)
+            if entry is not None and (entry['length'] != length or entry['expires_at'] <= now):
+                entry = None
+            if entry is not None:
+                stale, entry['stale'] = entry['stale'], set()
+                if not stale:
+                    return entry['free']
+            else:
+                # Changes committed while the day loads are recorded here.
+                marks = set()
+                self._loading[day].append(marks)
+
+        if entry is not None:
+            reloaded = free_bitmaps(day, day, length, list(stale))
+            with self._lock:
+                free = dict(entry['free'])
+                free.update({doctor_id: reloaded.get((doctor_id, day), 0) for doctor_id in stale})
+                entry['free'] = free
+                self.refreshes += 1
+            return free
+
+        free = {doctor_id: bits for (doctor_id, _), bits in free_bitmaps(day, day, length).items()}
+        with self._lock:
+            self._loading[day] = [other for other in self._loading[day] if other is not marks]
+            if not self._loading[day]:
+                del self._loading[day]
+            self._days = {cached: value for cached, value in self._days.items() if cached >= date.today()}
+            self._days[day] = {'expires_at': now + self.ttl, 'length': length, 'free': free, 'stale': marks}
+            self.loads += 1
+        return free
+
+    def discard(self, *keys):
+        with self._lock:
+            for doctor_id, day in keys:
+                if day in self._days:
+                    self._days[day]['stale'].add(doctor_id)
+                for marks in self._loading.get(day, ()):
+                    marks.add(doctor_id)
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'days': len(self._days), 'ttl': self.ttl, 'loads': self.loads, 'refreshes': self.refreshes,
+                    'stale': sum(len(entry['stale']) for entry in self._days.values())}
+
+
+slot_index = SlotIndex()
+
+
+def _lowest_bit(bits):
+    return (bits & -bits).bit_length() - 1
+
+
+# The first `limit` free slots across the department's active doctors
+# between the two days, earliest first (ties go to the lower doctor id).
+# Days are read from the index in order, and each day's doctors are merged
+# on a heap of their next free slot, so the search stops as soon as it has
+# enough slots.
+def earliest_slots(department_id, first_day, last_day, limit=10):
+    now = datetime.now()
+    length = slot_minutes()
+    doctors = {doctor.id: doctor for doctor in get_active_doctors(department_id)}
+    started_today = _bits(0, -(-_minute_of_day(now.time()) // length) - 1)
+
+    matches = []
+    day = max(first_day, now.date())
+    while day <= last_day and len(matches) < limit:
+        free = slot_index.free(day, length)
+        heap = []
+        for doctor_id in doctors:
+            bits = free.get(doctor_id, 0)
+            if day == now.date():
+                bits &= ~started_today
+            if bits:
+                heap.append((_lowest_bit(bits), doctor_id, bits))
+        heapq.heapify(heap)
+        while heap and len(matches) < limit:
+            index, doctor_id, bits = heap[0]
+            minute = index * length
+            matches.append(SlotMatch(day, time(minute // 60, minute % 60), doctors[doctor_id]))
+            bits &= bits - 1
+            if bits:
+                heapq.heapreplace(heap, (_lowest_bit(bits), doctor_id, bits))
+            else:
+                heapq.heappop(heap)
+        day += timedelta(days=1)
+    return matches
+
+
+def invalidate_doctor_slots(doctor_id, days=None):
+    if days is None:
+        today = date.today()
+        days = [today + timedelta(days=offset) for offset in range(BOOKING_WINDOW_DAYS)]
+    keys = [(doctor_id, day) for day in days]
+    slot_cache.discard(*keys)
+    slot_index.discard(*keys)
+
+
+# Changed (doctor_id, date) keys are collected on the session during the
+# flush and discarded once the transaction commits, so a request reading in
+# between cannot keep the pre-commit state cached. Keys marked by a flush
+# that is later rolled back are simply discarded at the next commit.
+def _mark_changed(target, keys):
+    session = object_session(target)
+    if session is None:
+        slot_cache.discard(*keys)
+        slot_index.discard(*keys)
+    else:
+        session.info.setdefault('changed_slots', set()).update(keys)
+
+
+def _keys(target, doctor_attribute, date_attribute):
+    state = inspect(target)
+    doctors = {getattr(target, doctor_attribute)}
+    days = {getattr(target, date_attribute)}
+    doctors.update(state.attrs[doctor_attribute].history.deleted)
+    days.update(state.attrs[date_attribute].history.deleted)
+    return {(doctor_id, day) for doctor_id in doctors for day in days}
+
+
+@event.listens_for(Appointment, 'after_insert')
+@event.listens_for(Appointment, 'after_update')
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_changed(mapper, connection, target):
+    _mark_changed(target, _keys(target, 'doctor_id', 'appointment_date'))
+
+
+@event.listens_for(DoctorAvailability, 'after_insert')
+@event.listens_for(DoctorAvailability, 'after_update')
+@event.listens_for(DoctorAvailability, 'after_delete')
+def _availability_changed(mapper, connection, target):
+    _mark_changed(target, _keys(target, 'doctor_id', 'date'))
+
+
+# A rule or exception can change any day, so every day the booking page or
+# the slot search can show is dropped for the doctor.
+def _window_keys(target):
+    doctors = {target.doctor_id}
+    doctors.update(inspect(target).attrs['doctor_id'].history.deleted)
+    today = date.today()
+    return {(doctor_id, today + timedelta(days=offset))
+            for doctor_id in doctors for offset in range(max(BOOKING_WINDOW_DAYS, SEARCH_WINDOW_DAYS))}
+
+
+@event.listens_for(ScheduleRule, 'after_insert')
+@event.listens_for(ScheduleRule, 'after_update')
+@event.listens_for(ScheduleRule, 'after_delete')
+@event.listens_for(ScheduleException, 'after_insert')
+@event.listens_for(ScheduleException, 'after_update')
+@event.listens_for(ScheduleException, 'after_delete')
+def _schedule_changed(mapper, connection, target):
+    _mark_changed(target, _window_keys(target))
+
+
+@event.listens_for(Session, 'after_commit')
+def _discard_changed_slots(session):
+    keys = session.info.pop('changed_slots', None)
+    if keys:
+        slot_cache.discard(*keys)
+        slot_index.discard(*keys)
@@ -0,0 +1,115 @@
+import re
+from sqlalchemy import event, false, literal_column, select, table, column, text
+from models import db
+
+# Full-text indexes for the doctor and patient search boxes. They live in
+# SQLite FTS5 virtual tables keyed by the doctor/patient id (the FTS rowid)
+# and are kept in sync by triggers, so every write path - the views, bulk
+# imports, manual SQL - updates them without any application code.
+_contact_digits = "replace(replace(replace(replace(replace({0}, ' ', ''), '-', ''), '+', ''), '(', ''), ')', '')"
+
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS doctor_search USING fts5(name, department, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(name, contact, tokenize='unicode61 remove_diacritics 2')",
+    """CREATE TRIGGER IF NOT EXISTS doctors_search_insert AFTER INSERT ON doctors BEGIN
+        INSERT INTO doctor_search(rowid, name, department)
+        VALUES (new.id, new.name, (SELECT name FROM departments WHERE id = new.department_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_search_update AFTER UPDATE OF name, department_id ON doctors BEGIN
+        UPDATE doctor_search
+        SET name = new.name, department = (SELECT name FROM departments WHERE id = new.department_id)
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_search_delete AFTER DELETE ON doctors BEGIN
+        DELETE FROM doctor_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS departments_search_update AFTER UPDATE OF name ON departments BEGIN
+        UPDATE doctor_search SET department = new.name
+        WHERE rowid IN (SELECT id FROM doctors WHERE department_id = new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS patients_search_insert AFTER INSERT ON patients BEGIN
+        INSERT INTO patient_search(rowid, name, contact)
+        VALUES (new.id, new.name, {_contact_digits.format('new.contact')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS patients_search_update AFTER UPDATE OF name, contact ON patients BEGIN
+        UPDATE patient_search SET name = new.name, contact = {_contact_digits.format('new.contact')}
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_search_delete AFTER DELETE ON patients BEGIN
+        DELETE FROM patient_search WHERE rowid = old.id;
+    END""",
+]
+
+REBUILD_DDL = [
+    "DELETE FROM doctor_search",
+    """INSERT INTO doctor_search(rowid, name, department)
+       SELECT doctors.id, doctors.name, departments.name
+       FROM doctors LEFT JOIN departments ON departments.id = doctors.department_id""",
+    "DELETE FROM patient_search",
+    f"""INSERT INTO patient_search(rowid, name, contact)
+        SELECT id, name, {_contact_digits.format('contact')} FROM patients""",
+]
+
+doctor_search = table('doctor_search', column('rowid'), column('rank'))
+patient_search = table('patient_search', column('rowid'), column('rank'))
+
+
+def create_search_index(connection):
+    existing = connection.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE name IN ('doctor_search', 'patient_search')"
+    )).scalar()
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+    # Tables that were just created start empty; fill them from the rows
+    # that are already there.
+    if existing < 2:
+        rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection):
+    for statement in REBUILD_DDL:
+        connection.execute(text(statement))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+# Turns free text into an FTS5 query: every word must match, and each word
+# also matches as a prefix ("car" finds "Cardiology"). Input that looks like
+# a phone number is collapsed to its digits to match the stored contact.
+def match_expression(term):
+    if re.fullmatch(r'[\d\s()+-]+', term or ''):
+        tokens = [re.sub(r'\D', '', term)]
+    else:
+        tokens = re.findall(r'\w+', term or '')
+    tokens = [token for token in tokens if token]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _matches(index, term):
+    expression = match_expression(term)
+    query = select(index.c.rowid, index.c.rank)
+    if not expression:
+        return query.where(false())
+    return query.where(literal_column(index.name).op('MATCH')(expression))
+
+
+def doctor_search_ids(term):
+    return select(_matches(doctor_search, term).subquery().c.rowid)
+
+
+def patient_search_ids(term):
+    return select(_matches(patient_search, term).subquery().c.rowid)
+
+
+# Subquery of (rowid, rank) to join against Doctor.id and order by rank,
+# best match first.
+def ranked_doctor_search(term):
+    return _matches(doctor_search, term).subquery()
+
+
+def ranked_doctor_ids(term):
+    matches = ranked_doctor_search(term)
+    return db.session.execute(select(matches.c.rowid).order_by(matches.c.rank)).scalars().all()
@@ -6,7 +6,7 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             flash('Please login to continue', 'warning')
-            return redirect(url_for('login'))
+            return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -17,10 +17,10 @@ def role_required(role):
         def decorated_function(*args, **kwargs):
             if 'user_id' not in session:
                 flash('Please login to continue', 'warning')
-                return redirect(url_for('login'))
+                return redirect(url_for('auth.login'))
             if session.get('role') != role:
                 flash('Access denied', 'danger')
-                return redirect(url_for('login'))
+                return redirect(url_for('auth.login'))
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -35,3 +35,9 @@ def validate_phone(phone):
 
 def validate_email(email):
     return '@' in email and '.' in email
+
+
+# Emails are stored lowercased, so login, registration and imports all look
+# accounts up by the same form of the address.
+def normalize_email(email):
+    return (email or '').strip().lower()
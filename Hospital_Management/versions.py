@@ -0,0 +1,115 @@
+import hashlib
+import time
+from datetime import date, datetime
+from functools import wraps
+from flask import current_app, request, session, make_response
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import object_session
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Appointment, Patient, Doctor, Department, ChangeVersion
+
+# Bulk jobs that bypass the ORM bump this scope; every ETag includes it.
+GLOBAL_SCOPE = 'global'
+
+# Changes to templates or code need new ETags too: this differs per process.
+PROCESS_TOKEN = str(time.time_ns())
+
+versions_table = ChangeVersion.__table__
+
+
+# Bumped on the connection the flush is using, so a version only moves
+# when the change it describes commits.
+def bump_versions(connection, *scopes):
+    now = datetime.utcnow()
+    statement = insert(versions_table).values(
+        [{'scope': scope, 'version': 1, 'updated_at': now} for scope in sorted(set(scopes))]
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=['scope'],
+        set_={'version': versions_table.c.version + 1, 'updated_at': statement.excluded.updated_at}
+    ))
+
+
+def doctor_scope(doctor_id):
+    return f'doctor:{doctor_id}'
+
+
+@event.listens_for(Appointment, 'after_insert')
+@event.listens_for(Appointment, 'after_update')
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_changed(mapper, connection, target):
+    doctors = {target.doctor_id}
+    doctors.update(inspect(target).attrs['doctor_id'].history.deleted)
+    bump_versions(connection, 'appointments', *[doctor_scope(doctor_id) for doctor_id in doctors])
+
+
+def _bumps(model, scope):
+    def changed(mapper, connection, target):
+        bump_versions(connection, scope)
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, name, changed)
+
+
+_bumps(Patient, 'patients')
+_bumps(Doctor, 'doctors')
+_bumps(Department, 'departments')
+
+
+# Row versions: version_id goes up by one on every ORM update that changes a
+# column, so cached renders keyed by it (see fragments.py) stop matching.
+# Bulk UPDATE statements have to bump it themselves.
+@event.listens_for(Appointment, 'before_update')
+@event.listens_for(Patient, 'before_update')
+@event.listens_for(Doctor, 'before_update')
+@event.listens_for(Department, 'before_update')
+def _bump_row_version(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version_id = (target.version_id or 0) + 1
+
+
+def get_versions(scopes):
+    rows = db.session.execute(
+        select(versions_table.c.scope, versions_table.c.version, versions_table.c.updated_at)
+        .where(versions_table.c.scope.in_(scopes))
+    ).all()
+    return {scope: (version, updated_at) for scope, version, updated_at in rows}
+
+
+# Wraps a GET view so a client that already has the current page gets a
+# 304 before the view runs any of its queries or renders anything.
+# `scopes` returns the change scopes the page depends on. The ETag also
+# covers the user, the full URL (cursors, filters), today's date (for
+# "upcoming" lists) and the process, so it is only reused for the same
+# page as seen by the same user. Requests with pending flash messages are
+# always rendered, as the messages are part of the page.
+# If-Modified-Since alone is never answered with 304: Last-Modified is
+# only sent for information, since second resolution cannot tell apart two
+# changes within the same second.
+def conditional_view(scopes):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            names = [GLOBAL_SCOPE] + list(scopes())
+            versions = get_versions(names)
+            fingerprint = '|'.join([
+                PROCESS_TOKEN, str(session.get('user_id')), str(session.get('name')), request.full_path,
+                date.today().isoformat(),
+                *[f'{name}={versions.get(name, (0, None))[0]}' for name in names],
+            ])
+            etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+            modified = [updated_at for version, updated_at in versions.values() if updated_at]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+            response.set_etag(etag, weak=True)
+            if modified:
+                response.last_modified = max(modified)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator